@@ -0,0 +1,53 @@
+"""add_note_search_vector
+
+Revision ID: 3f2a9c1d7e54
+Revises: 5c689dc3eaf7
+Create Date: 2026-10-18 10:12:41.518203
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel  # noqa: F401
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f2a9c1d7e54"
+down_revision: Union[str, Sequence[str], None] = "5c689dc3eaf7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Generated column: Postgres backfills existing rows and keeps it in sync on write
+    op.add_column(
+        "note",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(course_name, '')), 'B') || "
+                "setweight(to_tsvector('english', coalesce(description, '')), 'C')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_note_search_vector",
+        "note",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_note_search_vector", table_name="note", postgresql_using="gin")
+    op.drop_column("note", "search_vector")
@@ -0,0 +1,57 @@
+"""add_trigram_indexes
+
+Revision ID: 8b41d0e6a2c9
+Revises: 3f2a9c1d7e54
+Create Date: 2026-10-18 10:48:03.207114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa  # noqa: F401
+import sqlmodel  # noqa: F401
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8b41d0e6a2c9"
+down_revision: Union[str, Sequence[str], None] = "3f2a9c1d7e54"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_note_title_trgm",
+        "note",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_course_code_trgm",
+        "course",
+        ["code"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"code": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_course_title_trgm",
+        "course",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_course_title_trgm", table_name="course", postgresql_using="gin")
+    op.drop_index("ix_course_code_trgm", table_name="course", postgresql_using="gin")
+    op.drop_index("ix_note_title_trgm", table_name="note", postgresql_using="gin")
+    # The extension is left installed, other database objects may depend on it
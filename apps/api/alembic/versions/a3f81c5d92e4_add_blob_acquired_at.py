@@ -0,0 +1,32 @@
+"""add_blob_acquired_at
+
+Revision ID: a3f81c5d92e4
+Revises: d9a4c6f2b871
+Create Date: 2026-10-18 21:02:11.518340
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel  # noqa: F401
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3f81c5d92e4"
+down_revision: Union[str, Sequence[str], None] = "d9a4c6f2b871"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("blob", sa.Column("acquired_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE blob SET acquired_at = created_at")
+    op.alter_column("blob", "acquired_at", nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("blob", "acquired_at")
@@ -0,0 +1,42 @@
+"""unique_purchase_per_user_note
+
+Revision ID: a4d7f2e81b36
+Revises: e7c3a5b90f12
+Create Date: 2026-10-18 13:05:17.440986
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa  # noqa: F401
+import sqlmodel  # noqa: F401
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a4d7f2e81b36"
+down_revision: Union[str, Sequence[str], None] = "e7c3a5b90f12"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Racing purchases may already have left duplicates, keep the first of each
+    op.execute(
+        """
+        DELETE FROM purchase p
+        USING purchase earlier
+        WHERE p.user_id = earlier.user_id
+          AND p.note_id = earlier.note_id
+          AND p.id > earlier.id
+        """
+    )
+    op.create_unique_constraint(
+        "uq_purchase_user_id_note_id", "purchase", ["user_id", "note_id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("uq_purchase_user_id_note_id", "purchase", type_="unique")
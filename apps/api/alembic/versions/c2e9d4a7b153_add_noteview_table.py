@@ -0,0 +1,42 @@
+"""add_noteview_table
+
+Revision ID: c2e9d4a7b153
+Revises: a4d7f2e81b36
+Create Date: 2026-10-18 15:42:08.213557
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel  # noqa: F401
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c2e9d4a7b153"
+down_revision: Union[str, Sequence[str], None] = "a4d7f2e81b36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Unlogged: view de-dup state is disposable, skip the WAL
+    op.create_table(
+        "noteview",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("note_id", sa.Integer(), nullable=False),
+        sa.Column("viewed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("user_id", "note_id"),
+        prefixes=["UNLOGGED"],
+    )
+    op.create_index(
+        op.f("ix_noteview_viewed_at"), "noteview", ["viewed_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_noteview_viewed_at"), table_name="noteview")
+    op.drop_table("noteview")
@@ -0,0 +1,34 @@
+"""add_job_heartbeat_and_backoff
+
+Revision ID: d9a4c6f2b871
+Revises: b5d83e1f6a29
+Create Date: 2026-10-18 19:14:37.402118
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel  # noqa: F401
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d9a4c6f2b871"
+down_revision: Union[str, Sequence[str], None] = "b5d83e1f6a29"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("job", sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+    op.add_column("job", sa.Column("run_after", sa.DateTime(), nullable=True))
+    # Jobs running before the upgrade count as alive from their start
+    op.execute("UPDATE job SET heartbeat_at = started_at WHERE status = 'running'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("job", "run_after")
+    op.drop_column("job", "heartbeat_at")
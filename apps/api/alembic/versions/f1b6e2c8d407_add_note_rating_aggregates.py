@@ -0,0 +1,104 @@
+"""add_note_rating_aggregates
+
+Revision ID: f1b6e2c8d407
+Revises: c2e9d4a7b153
+Create Date: 2026-10-18 16:20:41.905312
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel  # noqa: F401
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f1b6e2c8d407"
+down_revision: Union[str, Sequence[str], None] = "c2e9d4a7b153"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # One rating per user and note from now on, keep the latest of any duplicates
+    op.execute(
+        """
+        DELETE FROM rating r
+        USING rating later
+        WHERE r.author_id = later.author_id
+          AND r.note_id = later.note_id
+          AND r.id < later.id
+        """
+    )
+    op.create_unique_constraint(
+        "uq_rating_author_id_note_id", "rating", ["author_id", "note_id"]
+    )
+    op.create_index(
+        "ix_rating_note_id_created_at_id",
+        "rating",
+        ["note_id", "created_at", "id"],
+        unique=False,
+    )
+
+    op.add_column(
+        "note",
+        sa.Column("rating_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "note",
+        sa.Column("rating_sum", sa.Float(), server_default="0", nullable=False),
+    )
+    op.execute(
+        """
+        UPDATE note
+        SET rating_count = agg.count, rating_sum = agg.sum
+        FROM (
+            SELECT note_id, count(*) AS count, sum(rating) AS sum
+            FROM rating
+            GROUP BY note_id
+        ) agg
+        WHERE note.id = agg.note_id
+        """
+    )
+    # The defaults only fill existing rows, the model sets them on insert
+    op.alter_column("note", "rating_count", server_default=None)
+    op.alter_column("note", "rating_sum", server_default=None)
+    # Generated from the backfilled aggregates
+    op.add_column(
+        "note",
+        sa.Column(
+            "rating_avg",
+            sa.Double(),
+            sa.Computed(
+                "coalesce(rating_sum / nullif(rating_count, 0), 0)", persisted=True
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_note_rating_avg_rating_count_created_at_id",
+        "note",
+        ["rating_avg", "rating_count", "created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_note_course_id_rating_avg_rating_count_created_at_id",
+        "note",
+        ["course_id", "rating_avg", "rating_count", "created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_note_course_id_rating_avg_rating_count_created_at_id", table_name="note"
+    )
+    op.drop_index("ix_note_rating_avg_rating_count_created_at_id", table_name="note")
+    op.drop_column("note", "rating_avg")
+    op.drop_column("note", "rating_sum")
+    op.drop_column("note", "rating_count")
+    op.drop_index("ix_rating_note_id_created_at_id", table_name="rating")
+    op.drop_constraint("uq_rating_author_id_note_id", "rating", type_="unique")
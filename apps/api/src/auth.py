@@ -1,10 +1,14 @@
 from __future__ import annotations
+import hashlib
+import time
 from typing import Optional, TypedDict, Any
 
 from fastapi import Header, HTTPException, Depends, status
-from jwt import decode as jwt_decode, InvalidTokenError, PyJWKClient
+from jwt import decode as jwt_decode, InvalidTokenError, PyJWKClientError
 
+from . import jwks
 from .settings import settings
+from .ttl_cache import TTLCache
 
 # NOTE: jwt_handler.py has been consolidated within this file
 
@@ -18,27 +22,10 @@ class TokenUser(TypedDict, total=False):
     is_admin: Optional[Any]
 
 
-# Caches JWK client across requests
-_jwk_client: Optional[PyJWKClient] = None
-
-
-def _jwks_url() -> str:
-    if settings.AUTH_JWKS_URL:
-        return settings.AUTH_JWKS_URL
-    if not settings.AUTH_ISSUER:
-        raise HTTPException(status_code=500, detail="AUTH_ISSUER not configured")
-    base = settings.AUTH_ISSUER.rstrip("/")
-    return f"{base}/.well-known/jwks.json"
-
-
-def _get_jwk_client() -> PyJWKClient:
-    global _jwk_client
-    url = _jwks_url()
-
-    # cache a single client instance (httpx.Client used for timeouts/reuse)
-    if _jwk_client is None or _jwk_client.uri != url:
-        _jwk_client = PyJWKClient(url, timeout=5)
-    return _jwk_client
+# Verified tokens, keyed by sha256 of the raw token: the same session token is sent
+# with every request on a page, so the RS256 check runs once per token instead.
+# Entries expire at the token's exp minus a clock-skew margin
+_token_cache = TTLCache(settings.AUTH_TOKEN_CACHE_MAX_ENTRIES, 0)
 
 
 async def get_current_user(
@@ -52,9 +39,14 @@ async def get_current_user(
         return None
 
     token = authorization.split(" ", 1)[1]
+    key = hashlib.sha256(token.encode()).digest()
+    cached = _token_cache.get(key)
+    if cached is not None:
+        return cached
+
     try:
-        jwk_client = _get_jwk_client()
-        signing_key = jwk_client.get_signing_key_from_jwt(token).key
+        # Keys are prefetched and refreshed in the background (see jwks.py)
+        signing_key = await jwks.signing_key(token)
 
         claims = jwt_decode(
             token,
@@ -71,7 +63,7 @@ async def get_current_user(
             or claims.get("clerk_email")
         )
         # Include role and is_admin from claims
-        return {
+        user: TokenUser = {
             "sub": claims.get("sub", ""),
             "name": name,
             "email": email,
@@ -79,8 +71,18 @@ async def get_current_user(
             "role": claims.get("role"),
             "is_admin": claims.get("is_admin"),
         }
+        ttl = claims["exp"] - time.time() - settings.AUTH_TOKEN_CACHE_SKEW_SECONDS
+        if ttl > 0:
+            _token_cache.set(key, user, ttl=ttl)
+        return user
     except InvalidTokenError as e:
         raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
+    except PyJWKClientError as e:
+        raise HTTPException(status_code=503, detail=f"Auth keys unavailable: {e}")
+
+
+def token_cache_stats() -> dict:
+    return _token_cache.stats()
 
 
 # Use this hard auth to require a valid user
@@ -0,0 +1,152 @@
+"""
+Benchmark note purchases under concurrency.
+
+Creates a throwaway course, a priced note and N buyers, then has all buyers purchase the
+note at once (every buyer also retries, to exercise the double-purchase path). All
+purchases credit the same author, so this is the worst case for row contention. Checks
+the ledger afterwards (one purchase and one debit per buyer, author credited exactly
+once per purchase) and removes everything it created.
+
+Run (from apps/api):
+python -m src.bench_purchase --buyers 200
+python -m src.bench_purchase --buyers 500 --attempts 3 --threads 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import List
+
+from sqlmodel import Session, delete, func, select
+
+from .db import AUTHOR_REVENUE_SHARE, create_purchase, engine
+from .models import Course, Note, Purchase, User
+
+
+@dataclass
+class BenchStats:
+    buyers: int = 0
+    attempts: int = 0
+    purchases: int = 0
+    duplicates_rejected: int = 0
+    errors: int = 0
+    elapsed_seconds: float = 0.0
+    purchases_per_second: float = 0.0
+    latency_p50_ms: float = 0.0
+    latency_p95_ms: float = 0.0
+    ledger_ok: bool = False
+
+
+def _setup(buyers: int, price: int, balance: int) -> tuple[int, int, List[int], int]:
+    tag = uuid.uuid4().hex[:8]
+    with Session(engine) as session:
+        author = User(email=f"bench-author-{tag}@bench.local", points=0)
+        course = Course(code=f"BENCH{tag}", title="Purchase benchmark", school="bench")
+        session.add(author)
+        session.add(course)
+        session.commit()
+        note = Note(
+            author_id=author.id,
+            course_id=course.id,
+            title="Benchmark note",
+            course_name="bench",
+            semester="bench",
+            price=price,
+        )
+        users = [
+            User(email=f"bench-{tag}-{i}@bench.local", points=balance)
+            for i in range(buyers)
+        ]
+        session.add(note)
+        session.add_all(users)
+        session.commit()
+        return course.id, note.id, [u.id for u in users], author.id
+
+
+def _teardown(course_id: int, note_id: int, user_ids: List[int]) -> None:
+    with Session(engine) as session:
+        session.exec(delete(Purchase).where(Purchase.note_id == note_id))
+        session.exec(delete(Note).where(Note.id == note_id))
+        session.exec(delete(User).where(User.id.in_(user_ids)))
+        session.exec(delete(Course).where(Course.id == course_id))
+        session.commit()
+
+
+def _buy(user_id: int, note_id: int, price: int) -> tuple[str, float]:
+    started = time.perf_counter()
+    with Session(engine) as session:
+        try:
+            create_purchase(session, user_id=user_id, note_id=note_id, price=price)
+            outcome = "ok"
+        except ValueError as e:
+            outcome = "duplicate" if "already purchased" in str(e) else "error"
+    return outcome, time.perf_counter() - started
+
+
+def run(
+    buyers: int, *, attempts: int = 2, threads: int = 100, price: int = 100
+) -> BenchStats:
+    balance = price * 10
+    course_id, note_id, buyer_ids, author_id = _setup(buyers, price, balance)
+    stats = BenchStats(buyers=buyers, attempts=buyers * attempts)
+    try:
+        jobs = [uid for _ in range(attempts) for uid in buyer_ids]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(lambda uid: _buy(uid, note_id, price), jobs))
+        stats.elapsed_seconds = round(time.perf_counter() - started, 3)
+
+        latencies = sorted(seconds * 1000 for _, seconds in results)
+        for outcome, _ in results:
+            if outcome == "ok":
+                stats.purchases += 1
+            elif outcome == "duplicate":
+                stats.duplicates_rejected += 1
+            else:
+                stats.errors += 1
+        stats.purchases_per_second = round(stats.purchases / stats.elapsed_seconds, 1)
+        stats.latency_p50_ms = round(statistics.median(latencies), 2)
+        stats.latency_p95_ms = round(latencies[int(len(latencies) * 0.95) - 1], 2)
+
+        with Session(engine) as session:
+            purchases = session.exec(
+                select(func.count()).where(Purchase.note_id == note_id)
+            ).one()
+            spent = session.exec(
+                select(func.sum(balance - User.points)).where(User.id.in_(buyer_ids))
+            ).one()
+            earned = session.get(User, author_id).points
+        stats.ledger_ok = (
+            purchases == buyers
+            and spent == buyers * price
+            and earned == buyers * int(price * AUTHOR_REVENUE_SHARE)
+        )
+    finally:
+        _teardown(course_id, note_id, buyer_ids + [author_id])
+    return stats
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark concurrent note purchases")
+    parser.add_argument("--buyers", type=int, default=200)
+    parser.add_argument(
+        "--attempts", type=int, default=2, help="purchase attempts per buyer"
+    )
+    parser.add_argument("--threads", type=int, default=100)
+    parser.add_argument("--price", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    stats = run(
+        args.buyers, attempts=args.attempts, threads=args.threads, price=args.price
+    )
+    for name, value in asdict(stats).items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark the transcription pipeline (OCR backend + PDF annotation).
+
+Transcribes a PDF `--runs` times with the given OCR backend and reports OCR and total
+latency. Without a file a synthetic text PDF of `--pages` pages is used, so with the
+local backend this runs fully offline. The first run includes backend setup (client,
+credentials) and is reported separately.
+
+Run (from apps/api):
+python -m src.bench_transcribe --backend local --pages 20
+python -m src.bench_transcribe notes.pdf --backend documentai --runs 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from typing import List
+
+import pymupdf
+
+from .ocr import BACKENDS
+from .transcribe import transcribe_pdf
+
+
+@dataclass
+class BenchStats:
+    backend: str = ""
+    pages: int = 0
+    paragraphs: int = 0
+    runs: int = 0
+    setup_ms: float = 0.0
+    ocr_p50_ms: float = 0.0
+    total_p50_ms: float = 0.0
+    total_max_ms: float = 0.0
+    pages_per_second: float = 0.0
+
+
+def synthetic_pdf(pages: int) -> bytes:
+    doc = pymupdf.open()
+    for n in range(pages):
+        page = doc.new_page()
+        for row in range(8):
+            page.insert_text(
+                (72, 90 + row * 80),
+                f"Page {n + 1}, paragraph {row + 1}: lecture notes on recursion",
+            )
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def run(raw_bytes: bytes, *, backend_name: str = "local", runs: int = 5) -> BenchStats:
+    started = time.perf_counter()
+    backend = BACKENDS[backend_name]()
+    setup = time.perf_counter() - started
+
+    ocr, total = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        pages = backend.recognize(raw_bytes)
+        ocr.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        transcribe_pdf(raw_bytes, False, backend=backend)
+        total.append(time.perf_counter() - started)
+
+    return BenchStats(
+        backend=backend_name,
+        pages=len(pages),
+        paragraphs=sum(len(p.paragraphs) for p in pages),
+        runs=runs,
+        setup_ms=round(setup * 1000, 2),
+        ocr_p50_ms=round(statistics.median(ocr) * 1000, 2),
+        total_p50_ms=round(statistics.median(total) * 1000, 2),
+        total_max_ms=round(max(total) * 1000, 2),
+        pages_per_second=round(len(pages) / statistics.median(total), 1),
+    )
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark PDF transcription")
+    parser.add_argument("pdf", nargs="?", help="PDF to transcribe (default: synthetic)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="local")
+    parser.add_argument("--runs", type=_positive_int, default=5)
+    parser.add_argument(
+        "--pages", type=_positive_int, default=10, help="pages of the synthetic PDF"
+    )
+    args = parser.parse_args(argv)
+
+    if args.pdf:
+        with open(args.pdf, "rb") as f:
+            raw_bytes = f.read()
+    else:
+        raw_bytes = synthetic_pdf(args.pages)
+
+    stats = run(raw_bytes, backend_name=args.backend, runs=args.runs)
+    for name, value in asdict(stats).items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session, select
+
+from . import minio_client, object_cache, previews
+from .models import Blob
+
+# Content-addressed note storage
+# Uploads are hashed (SHA-256) and stored under blobs/<digest>.pdf, so the same syllabus
+# uploaded by 40 students is stored once. The Blob table counts how many Notes point at
+# each object; the object is only deleted from MinIO when the last reference goes away.
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def blob_key(digest: str, ext: str = "pdf") -> str:
+    return f"blobs/{digest}.{ext}"
+
+
+def hash_fileobj(fileobj, max_bytes: Optional[int] = None) -> Tuple[str, int]:
+    """
+    SHA-256 a (spooled) file chunk by chunk and rewind it. Returns (hexdigest, size).
+    Raises UploadTooLargeError once max_bytes is exceeded.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := fileobj.read(HASH_CHUNK_SIZE):
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            raise minio_client.UploadTooLargeError(
+                f"File exceeds the {max_bytes} byte limit"
+            )
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
+
+
+def acquire_blob(
+    session: Session, *, sha256: str, object_key: str, size: int, bucket_name: str
+) -> bool:
+    """
+    Add a reference to the blob with this digest (creating the row on first sight).
+    Returns True if the caller must upload the bytes: it is the first reference, or
+    the object isn't in storage yet (an earlier upload still in flight, failed or
+    interrupted after its row was committed). Only duplicates whose object is
+    confirmed present get False and skip the S3 PUT. Identical bytes land under the
+    same key, so two uploads racing to PUT it are harmless.
+    """
+    # Single-statement upsert so concurrent uploads of the same file can't race
+    now = datetime.now(timezone.utc)
+    stmt = (
+        pg_insert(Blob)
+        .values(
+            sha256=sha256,
+            object_key=object_key,
+            size=size,
+            ref_count=1,
+            created_at=now,
+            acquired_at=now,
+        )
+        .on_conflict_do_update(
+            index_elements=[Blob.sha256],
+            set_={"ref_count": Blob.ref_count + 1, "acquired_at": now},
+        )
+        .returning(Blob.ref_count)
+    )
+    ref_count = session.exec(stmt).scalar_one()
+    session.commit()
+    if ref_count == 1:
+        return True
+    return minio_client.head_from_minio(object_key, bucket_name) is None
+
+
+def release_object(session: Session, object_key: str, bucket_name: str) -> bool:
+    """
+    Drop one reference to a stored object, deleting it from MinIO with the last one.
+    Objects outside the blob table (legacy uuid keys) have a single owner and are
+    deleted straight away. Returns True if the object was deleted.
+    """
+    # Row lock so a concurrent acquire_blob waits until we're done deleting
+    blob = session.exec(
+        select(Blob).where(Blob.object_key == object_key).with_for_update()
+    ).first()
+    if blob is None:
+        return _delete_object(object_key, bucket_name)
+
+    blob.ref_count -= 1
+    deleted = False
+    if blob.ref_count <= 0:
+        deleted = _delete_object(object_key, bucket_name)
+        session.delete(blob)
+    else:
+        session.add(blob)
+    session.commit()
+    return deleted
+
+
+def _delete_object(object_key: str, bucket_name: str) -> bool:
+    # The object plus its thumbnail/preview renditions
+    previews.delete_renditions(object_key, bucket_name)
+    for kind in previews.RENDITION_TYPES:
+        object_cache.invalidate(previews.rendition_key(object_key, kind), bucket_name)
+    object_cache.invalidate(object_key, bucket_name)
+    return minio_client.delete_from_minio(object_key, bucket_name)
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Optional
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .db import NOTE_COUNTERS, apply_note_counter_deltas_async, async_engine
+from .settings import settings
+
+# Buffered view/download counters
+# Popular notes would otherwise take an UPDATE (and a row lock) per page view. Each
+# worker accumulates deltas in memory and a background task writes them every
+# NOTE_COUNTER_FLUSH_SECONDS as one batched UPDATE; whatever is pending is flushed on
+# shutdown. A crash loses at most one interval of views, which is fine for counters.
+
+logger = logging.getLogger(__name__)
+
+_pending: "defaultdict[int, dict[str, int]]" = defaultdict(dict)
+_lock = threading.Lock()
+_task: Optional[asyncio.Task] = None
+
+stats = {"flushes": 0, "notes_flushed": 0, "failures": 0}
+
+
+def add(note_id: int, column: str, amount: int = 1) -> None:
+    if column not in NOTE_COUNTERS:
+        raise ValueError(f"Unknown counter {column}")
+    with _lock:
+        counts = _pending[note_id]
+        counts[column] = counts.get(column, 0) + amount
+
+
+def pending(note_id: int, column: str) -> int:
+    # Not yet flushed, add it to DB values so a user sees their own view counted
+    with _lock:
+        counts = _pending.get(note_id)
+        return counts.get(column, 0) if counts else 0
+
+
+def _take() -> dict[int, dict[str, int]]:
+    global _pending
+    with _lock:
+        deltas, _pending = _pending, defaultdict(dict)
+    return dict(deltas)
+
+
+def _restore(deltas: dict[int, dict[str, int]]) -> None:
+    # Put a failed batch back so it goes out with the next flush
+    for note_id, counts in deltas.items():
+        for column, amount in counts.items():
+            add(note_id, column, amount)
+
+
+async def flush() -> int:
+    deltas = _take()
+    if not deltas:
+        return 0
+    try:
+        async with AsyncSession(async_engine) as session:
+            rows = await apply_note_counter_deltas_async(session, deltas)
+    except asyncio.CancelledError:
+        # Shutdown caught us mid-flush, stop() flushes again
+        _restore(deltas)
+        raise
+    except Exception as e:
+        stats["failures"] += 1
+        logger.error(f"Failed to flush note counters: {e}")
+        _restore(deltas)
+        return 0
+    stats["flushes"] += 1
+    stats["notes_flushed"] += rows
+    return rows
+
+
+async def _flush_periodically(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await flush()
+
+
+def start() -> None:
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(
+            _flush_periodically(settings.NOTE_COUNTER_FLUSH_SECONDS)
+        )
+
+
+async def stop() -> None:
+    # Stop the background task and write out whatever is left
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+    await flush()
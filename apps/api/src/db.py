@@ -1,11 +1,116 @@
 # skeleton database code
-from collections.abc import Generator
+import base64
+import json
+import re
+from collections.abc import AsyncGenerator, Generator
+from datetime import datetime, timedelta, timezone
+from functools import reduce
 from typing import List, Optional, Tuple
+from sqlalchemy import (
+    DateTime,
+    Double,
+    and_,
+    bindparam,
+    case,
+    delete,
+    exists,
+    func,
+    literal,
+    or_,
+    tuple_,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import defer
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel, create_engine, Session, select  # noqa: F401
+from sqlmodel.ext.asyncio.session import AsyncSession
 from .settings import settings
-from .models import User, Course, Note, Purchase
-
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+from .pool import engine_options
+from .models import (
+    User,
+    Course,
+    Job,
+    Note,
+    NoteView,
+    Purchase,
+    Rating,
+    NOTE_SEARCH_CONFIG,
+)
+
+engine = create_engine(settings.DATABASE_URL, **engine_options())
+
+# Async engine for async def routes, so DB round-trips don't block the event loop.
+# psycopg 3 speaks both; the postgresql+psycopg URL works for either engine
+async_engine = create_async_engine(
+    settings.DATABASE_URL, **engine_options(is_async=True)
+)
+
+# Keyset pagination: a cursor is the sort key of the last row on the previous page,
+# base64-encoded so clients treat it as opaque. Page N costs the same as page 1.
+
+
+def encode_cursor(*values) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _is_datetime(column) -> bool:
+    # Plain DateTime or a decorated one (sqlmodel's UTCDateTime)
+    return isinstance(getattr(column.type, "impl", column.type), DateTime)
+
+
+def _cursor_value(column, value):
+    # Check a decoded cursor value against its key column: a wrong type would
+    # otherwise reach Postgres and fail the query instead of being a bad request
+    if _is_datetime(column):
+        if not isinstance(value, str):
+            raise ValueError("Invalid cursor")
+        return datetime.fromisoformat(value)
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    # JSON has one number type: floats may come back as ints, never as bools
+    allowed = (int, float) if python_type is float else python_type
+    if isinstance(value, bool) or not isinstance(value, allowed):
+        raise ValueError("Invalid cursor")
+    return value
+
+
+def keyset_page(
+    session: Session, stmt, keys: list, *, limit: int, cursor: Optional[str] = None
+) -> Tuple[list, Optional[str]]:
+    """
+    Run `stmt` (selecting one entity) ordered by `keys`, all descending, starting
+    after `cursor`. Returns (rows, next_cursor), next_cursor is None on the last page.
+    """
+    if cursor:
+        values = decode_cursor(cursor, len(keys))
+        try:
+            values = [_cursor_value(k, v) for k, v in zip(keys, values)]
+        except ValueError:
+            raise ValueError("Invalid cursor")
+        stmt = stmt.where(tuple_(*keys) < tuple_(*values))
+
+    # One extra row tells us whether there is a next page. execute(), not exec(), so
+    # the sort key columns come back alongside the entity
+    stmt = stmt.add_columns(*keys).order_by(*(k.desc() for k in keys))
+    rows = list(session.execute(stmt.limit(limit + 1)))
+    next_cursor = encode_cursor(*rows[limit - 1][1:]) if len(rows) > limit else None
+    return [row[0] for row in rows[:limit]], next_cursor
 
 
 def get_session() -> Generator[Session, None, None]:
@@ -13,6 +118,12 @@ def get_session() -> Generator[Session, None, None]:
         yield session
 
 
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    # expire_on_commit=False: lazy attribute refreshes would need an await
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 def get_all_notes() -> list[Note]:
     # Needs to return all note objects
     with Session(engine) as session:
@@ -36,42 +147,43 @@ def get_or_create_user(
     role: Optional[str] = None,
     is_admin: Optional[bool] = None,
 ) -> User:
-    # Prefer lookup by email; fallback to sub if provided
-    stmt = select(User).where(User.email == email)
-    user = session.exec(stmt).first()
-    if user:
-        # Minimal profile sync
-        if sub and user.sub != sub:
-            user.sub = sub
-        if name is not None:
-            user.name = name
-        if avatar_url is not None:
-            user.avatar_url = avatar_url
-        if school is not None:
-            user.school = school
-        # Sync role and is_admin from JWT claims
-        if role is not None:
-            user.role = role
-        if is_admin is not None:
-            user.is_admin = is_admin
-        session.add(user)
-        session.commit()
-        session.refresh(user)
+    # Sync the user row with auth claims. Claims left as None keep the stored value.
+    # Costs a single SELECT unless a claim actually changed (or it's a new user)
+    changes = _user_claim_changes(sub, name, avatar_url, school, role, is_admin)
+    user = session.exec(select(User).where(User.email == email)).first()
+    if user and all(getattr(user, k) == v for k, v in changes.items()):
         return user
 
-    user = User(
-        email=email,
-        sub=sub,
+    user = session.exec(_upsert_user(email, changes)).scalar_one()
+    session.commit()
+    session.refresh(user)
+    return user
+
+
+def _user_claim_changes(sub, name, avatar_url, school, role, is_admin) -> dict:
+    claims = dict(
+        sub=sub or None,
         name=name,
         avatar_url=avatar_url,
         school=school,
         role=role,
-        is_admin=is_admin or False,
+        is_admin=is_admin,
     )
-    session.add(user)
-    session.commit()
-    session.refresh(user)
-    return user
+    return {k: v for k, v in claims.items() if v is not None}
+
+
+def _upsert_user(email: str, changes: dict):
+    # First sight or changed claims: one upsert round-trip, race-free on email
+    values = User(email=email, **changes).model_dump(exclude={"id"})
+    stmt = (
+        pg_insert(User)
+        .values(**values)
+        .on_conflict_do_update(
+            index_elements=[User.email], set_=changes or {"email": email}
+        )
+        .returning(User)
+    )
+    return select(User).from_statement(stmt).execution_options(populate_existing=True)
 
 
 def create_course(session: Session, *, code: str, title: str, school: str) -> Course:
@@ -95,6 +207,8 @@ def create_note(
     file_type: Optional[str] = None,
     price: int = 100,
     is_free: bool = False,
+    job_kind: Optional[str] = None,
+    job_payload: Optional[dict] = None,
 ) -> Note:
     note = Note(
         author_id=author_id,
@@ -111,67 +225,35 @@ def create_note(
         views=0,
     )
     session.add(note)
+    if job_kind:
+        # Queued in the same transaction, a note never exists without its job
+        session.flush()
+        session.add(Job(kind=job_kind, note_id=note.id, payload=job_payload or {}))
     session.commit()
     session.refresh(note)
     return note
 
 
-# Subtract "amount" points from the user while preventing negative balances. Returns the updated user.
-def decrement_user_points(session: Session, *, user_id: int, amount: int) -> User:
-    if amount <= 0:
-        raise ValueError("amount must be > 0")
-
-    user = session.get(User, user_id)
-    if not user:
-        raise ValueError("User not found")
-
-    # We default points to 0 if null
-    if user.points is None:
-        user.points = 0
-
-    if user.points < amount:
-        raise ValueError("Insufficient points")
-
-    user.points -= amount
-    session.add(user)
-    session.commit()
-    session.refresh(user)
-    return user
-
-
-# Deduct points to 'purchase' a note. Returns (updated_user, note), with the new user state and purchase details.
-# Does not create a purchase record atm.
-def purchase_note(
-    session: Session, *, buyer_id: int, note_id: int, cost: int
-) -> Tuple[User, Note]:
-    if cost < 0:
-        raise ValueError("cost must be >= 0")
-
-    note = session.get(Note, note_id)
-    if not note:
-        raise ValueError("Note not found")
-
-    updated_user = decrement_user_points(session, user_id=buyer_id, amount=cost)
-    return updated_user, note
-
-
-# Get all notes a user has purchased
-def get_user_purchased_notes(session: Session, *, user_id: int) -> List[Note]:
+# Get notes a user has purchased, most recent purchase first. Returns (notes, next_cursor)
+def get_user_purchased_notes(
+    session: Session, *, user_id: int, limit: int = 20, cursor: Optional[str] = None
+) -> Tuple[List[Note], Optional[str]]:
     stmt = (
         select(Note)
         .join(Purchase, Purchase.note_id == Note.id)
         .where(Purchase.user_id == user_id)
-        .order_by(Purchase.purchased_at.desc())
     )
-    return list(session.exec(stmt))
+    keys = [Purchase.purchased_at, Purchase.id]
+    return keyset_page(session, stmt, keys, limit=limit, cursor=cursor)
 
 
-# Get all notes a user has uploaded
-def get_user_uploaded_notes(session: Session, *, user_id: int) -> List[Note]:
-    stmt = (
-        select(Note).where(Note.author_id == user_id).order_by(Note.created_at.desc())
-    )
-    return list(session.exec(stmt))
+# Get notes a user has uploaded, newest first. Returns (notes, next_cursor)
+def get_user_uploaded_notes(
+    session: Session, *, user_id: int, limit: int = 20, cursor: Optional[str] = None
+) -> Tuple[List[Note], Optional[str]]:
+    stmt = select(Note).where(Note.author_id == user_id)
+    keys = [Note.created_at, Note.id]
+    return keyset_page(session, stmt, keys, limit=limit, cursor=cursor)
 
 
 # Check if user already owns this note
@@ -183,47 +265,227 @@ def has_purchased_note(session: Session, *, user_id: int, note_id: int) -> bool:
     return session.exec(stmt).first() is not None
 
 
+AUTHOR_REVENUE_SHARE = 0.5
+
+
 def create_purchase(
     session: Session, *, user_id: int, note_id: int, price: int
 ) -> Purchase:
-    # Record a note purchase (checks for duplicates)
-    # Check if already purchased
-    if has_purchased_note(session, user_id=user_id, note_id=note_id):
-        raise ValueError("Note already purchased")
+    """
+    Record a note purchase: charge the buyer, credit the author (50% revenue share,
+    not for self-purchases) and insert the purchase, atomically in one statement.
+    Raises ValueError for duplicates, insufficient points or unknown user/note.
+    """
+    if price < 0:
+        raise ValueError("price must be >= 0")
+    now = literal(datetime.now(timezone.utc), Purchase.purchased_at.type)
+    row = select(literal(user_id), literal(note_id), literal(price), now)
 
-    # Get user and note
-    user = session.get(User, user_id)
-    note = session.get(Note, note_id)
+    if price > 0:
+        author_id = select(Note.author_id).where(Note.id == note_id).scalar_subquery()
+        already_owned = exists().where(
+            Purchase.user_id == user_id, Purchase.note_id == note_id
+        )
+        # Lock buyer and author in id order first: the UPDATE below locks rows in scan
+        # order, so two opposite purchases between the same users could deadlock.
+        # Repeat purchases skip the row locks entirely (in-flight ones are still caught
+        # by ON CONFLICT below)
+        session.exec(
+            select(User.id)
+            .where(User.id.in_([user_id, author_id]), ~already_owned)
+            .order_by(User.id)
+            .with_for_update(key_share=True)
+        ).all()
+        # Conditional UPDATE instead of read-check-write: the balance check and the
+        # debit happen under the row lock, so concurrent purchases can't overdraw
+        charged = (
+            update(User)
+            .where(
+                or_(
+                    and_(User.id == user_id, User.points >= price),
+                    and_(User.id == author_id, User.id != user_id),
+                ),
+                ~already_owned,
+            )
+            .values(
+                points=func.coalesce(User.points, 0)
+                + case(
+                    (User.id == user_id, -price),
+                    else_=int(price * AUTHOR_REVENUE_SHARE),
+                )
+            )
+            .returning(User.id)
+            .cte("charged")
+        )
+        row = row.where(exists().where(charged.c.id == user_id))
 
-    if not user or not note:
+    # ON CONFLICT on the (user_id, note_id) unique constraint catches double purchases
+    stmt = (
+        pg_insert(Purchase)
+        .from_select(["user_id", "note_id", "price_paid", "purchased_at"], row)
+        .on_conflict_do_nothing(index_elements=["user_id", "note_id"])
+        .returning(Purchase)
+    )
+    if price > 0:
+        stmt = stmt.add_cte(charged)
+
+    try:
+        purchase = session.exec(
+            select(Purchase).from_statement(stmt)
+        ).scalar_one_or_none()
+    except IntegrityError:
+        session.rollback()
         raise ValueError("User or note not found")
 
-    # Check if user can afford it
-    if price > 0:
-        if user.points is None or user.points < price:
-            raise ValueError("Insufficient points")
+    if purchase is None:
+        # Nothing inserted: undo the charge (if any) and work out why
+        session.rollback()
+        if has_purchased_note(session, user_id=user_id, note_id=note_id):
+            raise ValueError("Note already purchased")
+        if session.get(User, user_id) is None or session.get(Note, note_id) is None:
+            raise ValueError("User or note not found")
+        raise ValueError("Insufficient points")
 
-        # Deduct points from buyer
-        user.points -= price
-        session.add(user)
+    session.commit()
+    session.refresh(purchase)
+    return purchase
 
-    # Create purchase record
-    purchase = Purchase(user_id=user_id, note_id=note_id, price_paid=price)
-    session.add(purchase)
 
-    # Award points to note author (50% revenue share)
-    if price > 0:
-        author = session.get(User, note.author_id)
-        if author and author.id != user_id:  # Don't reward self-purchases
-            if author.points is None:
-                author.points = 0
-            author.points += int(price * 0.5)
-            session.add(author)
+RATING_MIN = 1
+RATING_MAX = 5
+
+
+def _note_rating_lock(note_id: int):
+    # Serializes rating writes per note so the count/sum deltas below are computed
+    # from the current rating. NO KEY UPDATE still lets purchases reference the note
+    return select(Note.id).where(Note.id == note_id).with_for_update(key_share=True)
+
+
+def _note_rating_bump(note_id: int, count: int, total: float):
+    return (
+        update(Note)
+        .where(Note.id == note_id)
+        .values(
+            rating_count=Note.rating_count + count,
+            rating_sum=Note.rating_sum + total,
+        )
+    )
+
+
+def _user_rating(user_id: int, note_id: int):
+    return select(Rating).where(Rating.author_id == user_id, Rating.note_id == note_id)
+
+
+def _delete_user_rating(user_id: int, note_id: int):
+    return (
+        delete(Rating)
+        .where(Rating.author_id == user_id, Rating.note_id == note_id)
+        .returning(Rating.rating)
+    )
+
+
+def _check_rating(rating: float) -> None:
+    if not RATING_MIN <= rating <= RATING_MAX:
+        raise ValueError(f"Rating must be between {RATING_MIN} and {RATING_MAX}")
+
+
+def _lock_note_for_rating(session: Session, note_id: int) -> None:
+    if session.exec(_note_rating_lock(note_id)).first() is None:
+        raise ValueError("Note not found")
+
+
+def _bump_note_rating(session: Session, note_id: int, count: int, total: float):
+    session.exec(_note_rating_bump(note_id, count, total))
 
+
+def rate_note(
+    session: Session,
+    *,
+    user_id: int,
+    note_id: int,
+    rating: float,
+    description: Optional[str] = None,
+) -> Rating:
+    """
+    Create or replace a user's rating of a note, updating the note's
+    rating_count/rating_sum in the same transaction.
+    Raises ValueError for out-of-range ratings or an unknown note.
+    """
+    _check_rating(rating)
+    _lock_note_for_rating(session, note_id)
+    existing = session.exec(_user_rating(user_id, note_id)).first()
+    if existing:
+        _bump_note_rating(session, note_id, 0, rating - existing.rating)
+        existing.rating = rating
+        existing.description = description
+        result = existing
+    else:
+        _bump_note_rating(session, note_id, 1, rating)
+        result = Rating(
+            author_id=user_id, note_id=note_id, rating=rating, description=description
+        )
+    session.add(result)
+    session.commit()
+    session.refresh(result)
+    return result
+
+
+def delete_rating(session: Session, *, user_id: int, note_id: int) -> None:
+    # Remove a user's rating of a note and take it out of the note's aggregates
+    _lock_note_for_rating(session, note_id)
+    removed = session.exec(_delete_user_rating(user_id, note_id)).first()
+    if removed is None:
+        session.rollback()
+        raise ValueError("Rating not found")
+    _bump_note_rating(session, note_id, -1, -removed[0])
     session.commit()
-    session.refresh(purchase)
 
-    return purchase
+
+# Get a note's ratings, newest first. Returns (ratings, next_cursor)
+def get_note_ratings(
+    session: Session, *, note_id: int, limit: int = 20, cursor: Optional[str] = None
+) -> Tuple[List[Rating], Optional[str]]:
+    stmt = select(Rating).where(Rating.note_id == note_id)
+    keys = [Rating.created_at, Rating.id]
+    return keyset_page(session, stmt, keys, limit=limit, cursor=cursor)
+
+
+# Web-search syntax, one token at a time: optional "-", then a "quoted phrase" or a
+# word. A trailing "*" marks a prefix term (calc* -> calculus, calc2 ...)
+_SEARCH_TOKEN = re.compile(r'(-?)("[^"]*"?|[^\s"]+)')
+_PREFIX_TERM = re.compile(r"\w+\*")
+
+
+def note_search_query(query: str):
+    """
+    Build a tsquery from user input with websearch_to_tsquery's rules ("exact phrase",
+    or, -exclude; adjacent terms AND, "or" splits the query into alternatives of
+    AND-ed terms) plus word* prefix matches. Every term is normalized by Postgres on
+    its own and the pieces are combined with the tsquery operators, so a prefix term
+    keeps its place: -calc* excludes, x or calc* is an alternative.
+    """
+    groups: List[list] = [[]]
+    for negated, term in _SEARCH_TOKEN.findall(query):
+        if not negated and term.lower() == "or":
+            if groups[-1]:
+                groups.append([])
+            continue
+        if _PREFIX_TERM.fullmatch(term):
+            # \w+ only, safe to hand to to_tsquery
+            tsquery = func.to_tsquery(NOTE_SEARCH_CONFIG, f"{term[:-1]}:*")
+        else:
+            tsquery = func.websearch_to_tsquery(NOTE_SEARCH_CONFIG, term)
+        groups[-1].append(func.tsquery_not(tsquery) if negated else tsquery)
+
+    alternatives = [reduce(lambda a, b: a.op("&&")(b), g) for g in groups if g]
+    if not alternatives:
+        return func.websearch_to_tsquery(NOTE_SEARCH_CONFIG, query)
+    return reduce(lambda a, b: a.op("||")(b), alternatives)
+
+
+def _set_trgm_threshold(session: Session, name: str, value: float) -> None:
+    # Transaction-local, so the indexed % / %> operators use our threshold
+    session.exec(select(func.set_config(f"pg_trgm.{name}", str(value), True))).one()
 
 
 def search_notes(
@@ -232,20 +494,21 @@ def search_notes(
     query: Optional[str] = None,
     course_id: Optional[int] = None,
     semester: Optional[str] = None,
+    fuzzy: bool = False,
+    sort: Optional[str] = None,
     limit: int = 20,
-    offset: int = 0,
-) -> List[Note]:
-    # Full-text search across notes with filters
-    stmt = select(Note)
-
-    if query:
-        # PostgreSQL full-text search (case-insensitive)
-        search_pattern = f"%{query}%"
-        stmt = stmt.where(
-            (Note.title.ilike(search_pattern))
-            | (Note.description.ilike(search_pattern))
-            | (Note.course_name.ilike(search_pattern))
-        )
+    cursor: Optional[str] = None,
+) -> Tuple[List[Note], Optional[str]]:
+    # Full-text search across notes with filters, newest first (best match first
+    # for text queries, or best rated first with sort="rating").
+    # Returns (notes, next_cursor)
+    # Scores are cast to double: a float4 doesn't survive the cursor round trip exactly
+    if sort not in (None, "rating"):
+        raise ValueError(f"Unknown sort {sort}")
+    # search_vector is only matched against here, never returned: don't ship every
+    # result's whole tsvector back over the wire
+    stmt = select(Note).options(defer(Note.search_vector))
+    keys = [Note.created_at, Note.id]
 
     if course_id:
         stmt = stmt.where(Note.course_id == course_id)
@@ -253,10 +516,334 @@ def search_notes(
     if semester:
         stmt = stmt.where(Note.semester == semester)
 
-    stmt = stmt.order_by(Note.created_at.desc()).offset(offset).limit(limit)
-    return list(session.exec(stmt))
+    if query and query.strip() and fuzzy:
+        # Typo-tolerant title match on the trigram index, closest titles first
+        _set_trgm_threshold(
+            session, "word_similarity_threshold", settings.NOTE_FUZZY_THRESHOLD
+        )
+        stmt = stmt.where(Note.title.op("%>")(query))
+        keys.insert(0, func.word_similarity(query, Note.title).cast(Double))
+    elif query and query.strip():
+        # GIN-indexed match on the generated search_vector, best matches first
+        tsquery = note_search_query(query)
+        stmt = stmt.where(Note.search_vector.op("@@")(tsquery))
+        keys.insert(0, func.ts_rank(Note.search_vector, tsquery).cast(Double))
+
+    if sort == "rating":
+        # Replaces relevance ordering; the query above still filters
+        keys = [Note.rating_avg, Note.rating_count, Note.created_at, Note.id]
+
+    return keyset_page(session, stmt, keys, limit=limit, cursor=cursor)
 
 
 def get_all_courses(session: Session) -> List[Course]:
     # Get all available courses for directory browsing
     return list(session.exec(select(Course).order_by(Course.code)))
+
+
+def search_courses(session: Session, *, query: str, limit: int = 10) -> List[Course]:
+    # Fuzzy course lookup: "cop 3502", "COP-3502" and "cop3520" all find COP3502,
+    # and misspelled titles still match
+    code = re.sub(r"[^0-9A-Za-z]", "", query).upper()
+    _set_trgm_threshold(
+        session, "similarity_threshold", settings.COURSE_FUZZY_THRESHOLD
+    )
+    _set_trgm_threshold(
+        session, "word_similarity_threshold", settings.COURSE_FUZZY_THRESHOLD
+    )
+    score = func.greatest(
+        func.similarity(Course.code, code), func.word_similarity(query, Course.title)
+    )
+    stmt = (
+        select(Course)
+        .where(or_(Course.code.op("%")(code), Course.title.op("%>")(query)))
+        .order_by(score.desc(), Course.code)
+        .limit(limit)
+    )
+    return list(session.exec(stmt))
+
+
+# Swap the file behind a note, only if it still points at `old_key` (not deleted or
+# replaced meanwhile). Returns True if swapped; the caller moves blob references
+def swap_note_object(
+    session: Session, *, note_id: int, old_key: str, new_key: str
+) -> bool:
+    result = session.exec(
+        update(Note)
+        .where(Note.id == note_id, Note.object_key == old_key)
+        .values(object_key=new_key)
+    )
+    session.commit()
+    return result.rowcount == 1
+
+
+# Background jobs (see jobs.py)
+
+
+def claim_job(session: Session, *, kinds: List[str]) -> Optional[Job]:
+    """
+    Mark the oldest queued job of one of `kinds` as running and return it, None if
+    there is nothing to do. SKIP LOCKED lets workers in every process claim at once
+    without getting the same job. Retries wait until their run_after.
+    """
+    now = datetime.now(timezone.utc)
+    next_id = (
+        select(Job.id)
+        .where(
+            Job.status == "queued",
+            Job.kind.in_(kinds),
+            or_(Job.run_after.is_(None), Job.run_after <= now),
+        )
+        .order_by(Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(Job)
+        .where(Job.id == next_id)
+        .values(
+            status="running",
+            attempts=Job.attempts + 1,
+            started_at=now,
+            heartbeat_at=now,
+            run_after=None,
+        )
+        .returning(Job)
+    )
+    job = session.exec(select(Job).from_statement(stmt)).scalar_one_or_none()
+    session.commit()
+    return job
+
+
+def finish_job(
+    session: Session,
+    *,
+    job_id: int,
+    error: Optional[str] = None,
+    retry_at: Optional[datetime] = None,
+) -> bool:
+    """
+    Mark a running job done, failed, or (with retry_at) queued for another attempt
+    no earlier than retry_at, keeping the error for status. Returns False if the job
+    was no longer running, i.e. it was requeued as stale meanwhile.
+    """
+    if error is None:
+        values = dict(status="done", error=None)
+    elif retry_at is not None:
+        values = dict(status="queued", error=error, run_after=retry_at)
+    else:
+        values = dict(status="failed", error=error)
+    result = session.exec(
+        update(Job)
+        .where(Job.id == job_id, Job.status == "running")
+        .values(finished_at=datetime.now(timezone.utc), **values)
+    )
+    session.commit()
+    return result.rowcount > 0
+
+
+def heartbeat_jobs(session: Session, *, job_ids: List[int]) -> None:
+    # The worker running these jobs is alive
+    session.exec(
+        update(Job)
+        .where(Job.id.in_(job_ids), Job.status == "running")
+        .values(heartbeat_at=datetime.now(timezone.utc))
+    )
+    session.commit()
+
+
+def requeue_jobs(
+    session: Session,
+    *,
+    job_ids: Optional[List[int]] = None,
+    heartbeat_before: Optional[datetime] = None,
+    max_attempts: Optional[int] = None,
+) -> Tuple[int, int]:
+    """
+    Put running jobs back in the queue: ones claimed but never started by this
+    worker, or ones whose worker stopped sending heartbeats (it died). With
+    max_attempts, jobs that already used them all fail instead, so a job that kills
+    its worker (e.g. out of memory) doesn't take down one worker after another.
+    Returns (requeued, failed).
+    """
+    out_of_attempts = literal(False)
+    if max_attempts is not None:
+        out_of_attempts = Job.attempts >= max_attempts
+    stmt = update(Job).where(Job.status == "running")
+    if job_ids is not None:
+        stmt = stmt.where(Job.id.in_(job_ids))
+    if heartbeat_before is not None:
+        stmt = stmt.where(Job.heartbeat_at < heartbeat_before)
+    stmt = stmt.values(
+        status=case((out_of_attempts, "failed"), else_="queued"),
+        error=case(
+            (out_of_attempts, "Worker stopped responding on every attempt"),
+            else_=Job.error,
+        ),
+        finished_at=case(
+            (out_of_attempts, datetime.now(timezone.utc)), else_=Job.finished_at
+        ),
+    ).returning(Job.status)
+    statuses = session.exec(stmt).scalars().all()
+    session.commit()
+    failed = statuses.count("failed")
+    return len(statuses) - failed, failed
+
+
+def get_latest_job(session: Session, *, note_id: int, kind: str) -> Optional[Job]:
+    stmt = (
+        select(Job)
+        .where(Job.note_id == note_id, Job.kind == kind)
+        .order_by(Job.id.desc())
+        .limit(1)
+    )
+    return session.exec(stmt).first()
+
+
+# Async versions of the helpers above, for async def routes using AsyncSession
+
+
+async def get_or_create_user_async(
+    session: AsyncSession,
+    *,
+    sub: Optional[str],
+    email: str,
+    name: Optional[str] = None,
+    avatar_url: Optional[str] = None,
+    school: Optional[str] = None,
+    role: Optional[str] = None,
+    is_admin: Optional[bool] = None,
+) -> User:
+    changes = _user_claim_changes(sub, name, avatar_url, school, role, is_admin)
+    user = (await session.exec(select(User).where(User.email == email))).first()
+    if user and all(getattr(user, k) == v for k, v in changes.items()):
+        return user
+
+    user = (await session.exec(_upsert_user(email, changes))).scalar_one()
+    await session.commit()
+    await session.refresh(user)
+    return user
+
+
+async def get_note_with_course_async(
+    session: AsyncSession, note_id: int
+) -> Tuple[Optional[Note], Optional[Course]]:
+    # Note plus its course in one round-trip
+    stmt = (
+        select(Note, Course)
+        .outerjoin(Course, Course.id == Note.course_id)
+        .where(Note.id == note_id)
+    )
+    row = (await session.exec(stmt)).first()
+    return (row[0], row[1]) if row else (None, None)
+
+
+async def has_purchased_note_async(
+    session: AsyncSession, *, user_id: int, note_id: int
+) -> bool:
+    stmt = select(Purchase.id).where(
+        Purchase.user_id == user_id, Purchase.note_id == note_id
+    )
+    return (await session.exec(stmt)).first() is not None
+
+
+async def rate_note_async(
+    session: AsyncSession,
+    *,
+    user_id: int,
+    note_id: int,
+    rating: float,
+    description: Optional[str] = None,
+) -> Rating:
+    _check_rating(rating)
+    if (await session.exec(_note_rating_lock(note_id))).first() is None:
+        raise ValueError("Note not found")
+    existing = (await session.exec(_user_rating(user_id, note_id))).first()
+    if existing:
+        await session.exec(_note_rating_bump(note_id, 0, rating - existing.rating))
+        existing.rating = rating
+        existing.description = description
+        result = existing
+    else:
+        await session.exec(_note_rating_bump(note_id, 1, rating))
+        result = Rating(
+            author_id=user_id, note_id=note_id, rating=rating, description=description
+        )
+    session.add(result)
+    await session.commit()
+    await session.refresh(result)
+    return result
+
+
+async def delete_rating_async(
+    session: AsyncSession, *, user_id: int, note_id: int
+) -> None:
+    if (await session.exec(_note_rating_lock(note_id))).first() is None:
+        raise ValueError("Note not found")
+    removed = (await session.exec(_delete_user_rating(user_id, note_id))).first()
+    if removed is None:
+        await session.rollback()
+        raise ValueError("Rating not found")
+    await session.exec(_note_rating_bump(note_id, -1, -removed[0]))
+    await session.commit()
+
+
+NOTE_COUNTERS = ("views", "downloads")
+
+
+async def apply_note_counter_deltas_async(
+    session: AsyncSession, deltas: dict[int, dict[str, int]]
+) -> int:
+    """
+    Add buffered {note_id: {"views": n, "downloads": m}} deltas in one batched
+    UPDATE (executemany). Rows go in id order so flushes from several workers can't
+    deadlock each other. Returns the number of notes updated.
+    """
+    if not deltas:
+        return 0
+    table = Note.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            {
+                column: func.coalesce(table.c[column], 0) + bindparam(f"b_{column}")
+                for column in NOTE_COUNTERS
+            }
+        )
+    )
+    params = [
+        {"b_id": note_id, **{f"b_{c}": counts.get(c, 0) for c in NOTE_COUNTERS}}
+        for note_id, counts in sorted(deltas.items())
+    ]
+    connection = await session.connection()
+    await connection.execute(stmt, params)
+    await session.commit()
+    return len(params)
+
+
+async def mark_note_viewed_async(
+    session: AsyncSession, *, user_id: int, note_id: int, cooldown: timedelta
+) -> bool:
+    # True if this view should count: first view, or the last counted one is older
+    # than the cooldown. Single statement, so workers racing on the same view agree
+    stmt = pg_insert(NoteView).values(
+        user_id=user_id, note_id=note_id, viewed_at=func.now()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[NoteView.user_id, NoteView.note_id],
+        set_={"viewed_at": stmt.excluded.viewed_at},
+        where=NoteView.viewed_at < func.now() - cooldown,
+    ).returning(NoteView.note_id)
+    counted = (await session.exec(stmt)).first() is not None
+    await session.commit()
+    return counted
+
+
+async def prune_note_views_async(session: AsyncSession, *, cooldown: timedelta) -> int:
+    # Rows past the cooldown no longer suppress anything
+    stmt = delete(NoteView).where(NoteView.viewed_at < func.now() - cooldown)
+    result = await session.exec(stmt)
+    await session.commit()
+    return result.rowcount
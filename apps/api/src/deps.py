@@ -1,13 +1,21 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from typing import Optional
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Generator
 
-from fastapi import Depends, HTTPException, status, Query
+from fastapi import Depends, HTTPException, status, Query, Response
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: F401
 
-from .db import get_session, get_or_create_user
+from .db import (
+    get_session,
+    get_async_session,
+    get_or_create_user,
+    get_or_create_user_async,
+)
 from .models import User
+from .settings import settings
+from .ttl_cache import TTLCache
 
 # This file gives us a single place to import dependencies when creating/developing routers
 # i.e. can cleanly give a router access to auth + jwt/database as necessary w/o messy imports
@@ -25,6 +33,7 @@ from .models import (  # noqa: F401
     Note,
     Course,
     Purchase,
+    Rating,
 )
 
 # Re-export commonly used DB functions
@@ -35,18 +44,59 @@ from .db import (  # noqa: F401
     get_user_uploaded_notes,
     create_purchase,
     has_purchased_note,
+    rate_note,
+    delete_rating,
+    get_note_ratings,
+    get_latest_job,
+    RATING_MIN,
+    RATING_MAX,
     create_course,
     get_all_courses,
     get_all_notes,
+    search_courses,
+    get_note_with_course_async,
+    has_purchased_note_async,
+    rate_note_async,
+    delete_rating_async,
 )
 
 # Re-export MinIO functions
 from .minio_client import (  # noqa: F401
     upload_bytes_to_minio,
+    upload_stream_to_minio,
+    is_pdf_header,
+    UploadTooLargeError,
     get_file_from_minio,
+    stream_from_minio,
+    head_from_minio,
+    read_range_from_minio,
+    copy_within_minio,
     delete_from_minio,
     presign_put,
     presign_get,
+    content_disposition,
+)
+
+# Non-blocking versions of the MinIO helpers for async routes, e.g.
+# `await storage.get_file_from_minio(...)`
+from . import storage  # noqa: F401
+from .object_cache import cache_stats  # noqa: F401
+
+# Content-addressed (deduplicated) note storage
+from .blobs import (  # noqa: F401
+    blob_key,
+    hash_fileobj,
+    acquire_blob,
+    release_object,
+)
+
+# Thumbnail/preview renditions
+from .previews import (  # noqa: F401
+    ensure_renditions,
+    rendition_key,
+    RENDITION_TYPES,
+    THUMBNAIL,
+    PREVIEW,
 )
 
 
@@ -54,12 +104,20 @@ def db_session() -> Generator[Session, None, None]:
     yield from get_session()
 
 
-def get_current_db_user(
-    token: TokenUser = Depends(require_user), session: Session = Depends(db_session)
-) -> User:
-    # Get or create DB user from authenticated Clerk token. Always succeeds if JWT is valid
-    return get_or_create_user(
-        session,
+# Use this one in async def routes, sync sessions would block the event loop
+async def async_db_session() -> AsyncGenerator[AsyncSession, None]:
+    async for session in get_async_session():
+        yield session
+
+
+# sub -> (claims, user id) for users whose row already matches their token claims,
+# see get_current_db_user. Only identity is cached: points, is_admin and the profile
+# are read from the row on every request, so changes made by any worker apply at once
+_user_cache = TTLCache(settings.USER_CACHE_MAX_ENTRIES, settings.USER_CACHE_TTL_SECONDS)
+
+
+def _token_claims(token: TokenUser) -> dict:
+    return dict(
         sub=token["sub"],
         email=token.get("email") or f"{token['sub']}@unknown.local",
         name=token.get("name"),
@@ -68,6 +126,47 @@ def get_current_db_user(
     )
 
 
+def _cached_user_id(claims: dict) -> Optional[int]:
+    # Same claims as last time, the row is in sync: a primary key lookup, no upsert
+    cached = _user_cache.get(claims["sub"])
+    if cached is not None and cached[0] == claims:
+        return cached[1]
+    return None
+
+
+def get_current_db_user(
+    token: TokenUser = Depends(require_user), session: Session = Depends(db_session)
+) -> User:
+    # Get or create DB user from authenticated Clerk token. Always succeeds if JWT is valid
+    claims = _token_claims(token)
+    user_id = _cached_user_id(claims)
+    if user_id is not None:
+        user = session.get(User, user_id)
+        if user is not None:
+            return user
+
+    user = get_or_create_user(session, **claims)
+    _user_cache.set(claims["sub"], (claims, user.id))
+    return user
+
+
+# Same as get_current_db_user for async def routes, on the async session
+async def get_current_db_user_async(
+    token: TokenUser = Depends(require_user),
+    session: AsyncSession = Depends(async_db_session),
+) -> User:
+    claims = _token_claims(token)
+    user_id = _cached_user_id(claims)
+    if user_id is not None:
+        user = await session.get(User, user_id)
+        if user is not None:
+            return user
+
+    user = await get_or_create_user_async(session, **claims)
+    _user_cache.set(claims["sub"], (claims, user.id))
+    return user
+
+
 # Convert various truthy values to bool
 def _parse_is_admin(val) -> bool:
     if isinstance(val, bool):
@@ -79,22 +178,38 @@ def _parse_is_admin(val) -> bool:
     return False
 
 
-# Pagination helper (for when we start dealing with the DB more)
+# Keyset pagination params for list endpoints. The next page's cursor is returned in
+# the X-Next-Cursor response header (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
 @dataclass
 class Page:
     limit: int = 20
-    cursor: Optional[int] = None
+    cursor: Optional[str] = None
 
 
 def page(
     limit: int = Query(20, ge=1, le=100),
-    cursor: Optional[int] = Query(
-        None, description="id of last item from previous page"
+    cursor: Optional[str] = Query(
+        None, description="X-Next-Cursor header value from the previous page"
     ),
 ) -> Page:
     return Page(limit=limit, cursor=cursor)
 
 
+def paginated(response: Response, fetch, **kwargs) -> list:
+    # Call a keyset db helper returning (items, next_cursor), put the cursor in the
+    # response header. Bad cursors raise ValueError in the db layer -> 400
+    try:
+        items, next_cursor = fetch(**kwargs)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
+
+
 # Enforce admin access based on DB role/is_admin
 def require_admin_db(current_user: User = Depends(get_current_db_user)) -> User:
     allowed_roles = {"admin", "dev", "developer", "superadmin"}
@@ -0,0 +1,250 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+from sqlmodel import Session
+
+from . import minio_client, previews
+from .blobs import acquire_blob, blob_key, release_object
+from .db import (
+    claim_job,
+    engine,
+    finish_job,
+    heartbeat_jobs,
+    requeue_jobs,
+    swap_note_object,
+)
+from .models import Job, Note
+from .settings import settings
+
+# Background jobs
+# Slow work (PDF transcription) runs outside the request: the route stores a Job row
+# in the same transaction as its note and returns, JOB_WORKERS tasks per process claim
+# queued jobs from the table and run their handler in a thread. Jobs are durable: a
+# restart picks up queued ones, and every process heartbeats the jobs it runs while
+# requeuing running ones whose heartbeat is older than JOB_STALE_SECONDS (their
+# worker died), or failing them once they used up JOB_MAX_ATTEMPTS. Shutdown lets
+# running handlers finish rather than handing their job to another process mid-run.
+# Failures are retried up to JOB_MAX_ATTEMPTS times with exponential backoff.
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIBE = "transcribe"
+
+HANDLERS: Dict[str, Callable[[Job], None]] = {}
+
+_tasks: list = []
+_heartbeat_task: Optional[asyncio.Task] = None
+_running: set = set()  # claimed by this process
+_inflight: Dict[int, asyncio.Future] = {}  # handler threads, by job id
+_wakeup: Optional[asyncio.Event] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+stats = {
+    "done": 0,
+    "failed": 0,
+    "retried": 0,
+    "requeued_stale": 0,
+    "failed_stale": 0,
+    "lost": 0,
+}
+
+
+def handler(kind: str):
+    # Register the function that runs jobs of this kind (blocking, runs in a thread)
+    def register(fn: Callable[[Job], None]):
+        HANDLERS[kind] = fn
+        return fn
+
+    return register
+
+
+def notify() -> None:
+    # Call after committing a job: wakes an idle worker in this process, others find
+    # the job on their next poll
+    if _loop is not None and _wakeup is not None:
+        _loop.call_soon_threadsafe(_wakeup.set)
+
+
+def _claim() -> Optional[Job]:
+    with Session(engine) as session:
+        job = claim_job(session, kinds=list(HANDLERS))
+        if job is not None:
+            _running.add(job.id)
+        return job
+
+
+def _retry_at(job: Job) -> datetime:
+    delay = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** max(job.attempts - 1, 0)
+    return datetime.now(timezone.utc) + timedelta(seconds=delay)
+
+
+def _run(job: Job) -> None:
+    try:
+        HANDLERS[job.kind](job)
+        error = None
+    except Exception as e:
+        logger.error(f"Job {job.id} ({job.kind}) failed: {e}", exc_info=True)
+        error = str(e) or type(e).__name__
+
+    retry_at = None
+    if error is not None and job.attempts < settings.JOB_MAX_ATTEMPTS:
+        retry_at = _retry_at(job)
+    with Session(engine) as session:
+        owned = finish_job(session, job_id=job.id, error=error, retry_at=retry_at)
+    _running.discard(job.id)
+    if not owned:
+        # Our heartbeat lapsed and another worker took the job over
+        stats["lost"] += 1
+        logger.warning(f"Job {job.id} was requeued while running, result dropped")
+    elif error is None:
+        stats["done"] += 1
+    elif retry_at is not None:
+        stats["retried"] += 1
+    else:
+        stats["failed"] += 1
+
+
+async def _work() -> None:
+    while True:
+        _wakeup.clear()
+        try:
+            job = await asyncio.to_thread(_claim)
+        except Exception as e:
+            logger.error(f"Failed to claim a job: {e}")
+            job = None
+        if job is None:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), settings.JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        run = asyncio.ensure_future(asyncio.to_thread(_run, job))
+        _inflight[job.id] = run
+        run.add_done_callback(lambda _, job_id=job.id: _inflight.pop(job_id, None))
+        # Cancelling the worker doesn't abandon the handler, stop() waits for it
+        await asyncio.shield(run)
+
+
+def _beat() -> int:
+    # Keep this process's jobs alive, requeue the ones whose worker stopped beating
+    # (or fail them, once they've used up their attempts)
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.JOB_STALE_SECONDS)
+    with Session(engine) as session:
+        if _running:
+            heartbeat_jobs(session, job_ids=list(_running))
+        requeued, failed = requeue_jobs(
+            session, heartbeat_before=cutoff, max_attempts=settings.JOB_MAX_ATTEMPTS
+        )
+    if failed:
+        stats["failed_stale"] += failed
+        logger.error(f"Failed {failed} stale jobs that were out of attempts")
+    if requeued:
+        stats["requeued_stale"] += requeued
+        logger.warning(f"Requeued {requeued} stale jobs")
+        notify()
+    return requeued
+
+
+async def _heartbeat() -> None:
+    while True:
+        await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+        try:
+            await asyncio.to_thread(_beat)
+        except Exception as e:
+            logger.error(f"Job heartbeat failed: {e}")
+
+
+async def start() -> None:
+    global _wakeup, _loop, _heartbeat_task
+    if settings.JOB_WORKERS <= 0 or _tasks:
+        return
+    _wakeup, _loop = asyncio.Event(), asyncio.get_running_loop()
+    await asyncio.to_thread(_beat)
+    for _ in range(settings.JOB_WORKERS):
+        _tasks.append(asyncio.create_task(_work()))
+    _heartbeat_task = asyncio.create_task(_heartbeat())
+
+
+async def stop() -> None:
+    # Handlers running in their thread can't be interrupted: wait for them, still
+    # heartbeating so no other process takes their jobs over. Ones that outlast
+    # JOB_SHUTDOWN_SECONDS are requeued by other processes once their heartbeat is stale
+    global _wakeup, _loop, _heartbeat_task
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+
+    # Claimed as the workers were cancelled, never started: back in the queue now
+    unstarted = _running - _inflight.keys()
+    if unstarted:
+        with Session(engine) as session:
+            requeue_jobs(session, job_ids=list(unstarted))
+        _running.difference_update(unstarted)
+
+    if _inflight:
+        _, pending = await asyncio.wait(
+            list(_inflight.values()), timeout=settings.JOB_SHUTDOWN_SECONDS
+        )
+        if pending:
+            logger.warning(f"{len(pending)} jobs still running at shutdown")
+
+    if _heartbeat_task is not None:
+        _heartbeat_task.cancel()
+        await asyncio.gather(_heartbeat_task, return_exceptions=True)
+        _heartbeat_task = None
+    _wakeup = _loop = None
+
+
+def info() -> dict:
+    return {"workers": len(_tasks), "running": len(_running), **stats}
+
+
+@handler(TRANSCRIBE)
+def _transcribe_note(job: Job) -> None:
+    """
+    OCR the note's PDF and swap the annotated copy in. The original stays served
+    until then; a note deleted or re-pointed meanwhile keeps what it has.
+    """
+    # Imported here: the OCR and PDF annotation libraries are slow to import
+    from .transcribe import transcribe_pdf
+
+    original_key = job.payload.get("object_key")
+    with Session(engine) as session:
+        note = session.get(Note, job.note_id)
+        # Gone, or already swapped by an earlier attempt that outlived its worker
+        if note is None or not original_key or note.object_key != original_key:
+            return
+
+    original = minio_client.get_file_from_minio(original_key, "notes")
+    if original is None:
+        raise RuntimeError(f"Original {original_key} not found in storage")
+    data = transcribe_pdf(original.read(), job.payload.get("autocorrect", False))
+
+    digest = hashlib.sha256(data).hexdigest()
+    object_key = blob_key(digest)
+    with Session(engine) as session:
+        if acquire_blob(
+            session,
+            sha256=digest,
+            object_key=object_key,
+            size=len(data),
+            bucket_name="notes",
+        ):
+            if not minio_client.upload_bytes_to_minio(
+                data, object_key, "notes", "application/pdf"
+            ):
+                release_object(session, object_key, "notes")
+                raise RuntimeError(f"Failed to upload {object_key} to storage")
+
+        swapped = swap_note_object(
+            session, note_id=job.note_id, old_key=original_key, new_key=object_key
+        )
+        # Drop the reference that is no longer used
+        release_object(session, original_key if swapped else object_key, "notes")
+
+    if swapped and settings.NOTE_PREVIEWS_ON_UPLOAD:
+        previews.ensure_renditions(object_key, "notes")
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Optional
+
+from jwt import PyJWKClient, PyJWKSet, get_unverified_header
+from jwt.exceptions import InvalidTokenError, PyJWKClientError
+
+from .settings import settings
+
+# Signing keys for token verification, kept off the request path
+# The JWKS is fetched during startup and refreshed every AUTH_JWKS_REFRESH_SECONDS by a
+# background task. A failed refresh keeps serving the previous keys (stale while
+# revalidate). A token signed with an unknown kid (key rotation) triggers one
+# deduplicated refresh, at most every AUTH_JWKS_MIN_REFRESH_SECONDS. Fetches run in a
+# thread so they never block the event loop. AUTH_JWKS_FILE loads keys from a local
+# JWKS file instead, for load tests and offline CI with a stand-in issuer.
+
+logger = logging.getLogger(__name__)
+
+_keys: Optional[PyJWKSet] = None
+_last_attempt = float("-inf")
+_refreshing: Optional[asyncio.Task] = None
+_task: Optional[asyncio.Task] = None
+
+stats = {"refreshes": 0, "failures": 0, "unknown_kid": 0}
+
+
+def jwks_url() -> Optional[str]:
+    if settings.AUTH_JWKS_URL:
+        return settings.AUTH_JWKS_URL
+    if not settings.AUTH_ISSUER:
+        return None
+    base = settings.AUTH_ISSUER.rstrip("/")
+    return f"{base}/.well-known/jwks.json"
+
+
+def configured() -> bool:
+    return bool(settings.AUTH_JWKS_FILE or jwks_url())
+
+
+def _load() -> PyJWKSet:
+    # Blocking file read or HTTP fetch, run it in a thread
+    if settings.AUTH_JWKS_FILE:
+        with open(settings.AUTH_JWKS_FILE) as f:
+            return PyJWKSet.from_dict(json.load(f))
+    url = jwks_url()
+    if not url:
+        raise PyJWKClientError("AUTH_ISSUER not configured")
+    client = PyJWKClient(url, cache_jwk_set=False, timeout=settings.AUTH_JWKS_TIMEOUT)
+    return client.get_jwk_set()
+
+
+async def _refresh() -> bool:
+    global _keys, _last_attempt
+    _last_attempt = time.monotonic()
+    try:
+        keys = await asyncio.to_thread(_load)
+    except Exception as e:
+        stats["failures"] += 1
+        logger.error(f"JWKS refresh failed, keeping previous keys: {e}")
+        return False
+    _keys = keys
+    stats["refreshes"] += 1
+    return True
+
+
+async def refresh() -> bool:
+    # Concurrent callers share one in-flight fetch
+    global _refreshing
+    if _refreshing is None or _refreshing.done():
+        _refreshing = asyncio.create_task(_refresh())
+    return await asyncio.shield(_refreshing)
+
+
+def _find(kid: Optional[str]):
+    if _keys is None:
+        return None
+    if kid is None:
+        # No kid in the header: only unambiguous with a single key
+        return _keys.keys[0].key if len(_keys.keys) == 1 else None
+    try:
+        return _keys[kid].key
+    except KeyError:
+        return None
+
+
+async def signing_key(token: str):
+    """
+    Public key for the token's kid. Raises InvalidTokenError for a malformed token or
+    an unknown kid, PyJWKClientError when no keys could be loaded at all.
+    """
+    kid = get_unverified_header(token).get("kid")
+    key = _find(kid)
+    if key is None:
+        stats["unknown_kid"] += 1
+        since = time.monotonic() - _last_attempt
+        if since >= settings.AUTH_JWKS_MIN_REFRESH_SECONDS:
+            await refresh()
+            key = _find(kid)
+    if key is None:
+        if _keys is None:
+            raise PyJWKClientError("Signing keys unavailable")
+        raise InvalidTokenError(f"Unknown signing key {kid}")
+    return key
+
+
+async def _refresh_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.AUTH_JWKS_REFRESH_SECONDS)
+        await refresh()
+
+
+async def start() -> None:
+    # Prefetch, then keep the keys fresh in the background
+    global _task
+    if not configured():
+        logger.warning("AUTH_ISSUER/AUTH_JWKS_FILE not set, skipping JWKS prefetch")
+        return
+    await refresh()
+    if _task is None:
+        _task = asyncio.create_task(_refresh_periodically())
+
+
+async def stop() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+def info() -> dict:
+    return {
+        "source": settings.AUTH_JWKS_FILE or jwks_url(),
+        "keys": len(_keys.keys) if _keys is not None else 0,
+        **stats,
+    }
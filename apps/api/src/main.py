@@ -1,3 +1,4 @@
+import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -5,21 +6,55 @@ from sqlalchemy import text
 import uvicorn
 
 from .settings import settings
-from .db import engine
+from .deps import NEXT_CURSOR_HEADER
+from .db import async_engine
 from .routers import health, files, users, courses, notes
-from .minio_client import create_bucket
+from . import counters, jobs, jwks, storage, view_dedup
+from .metrics import PROCESS_START, record_startup
 
 BUCKET_NAME = settings.MINIO_BUCKET
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_bucket(BUCKET_NAME)
+    record_startup("import", time.perf_counter() - PROCESS_START)
+
+    # STARTUP: verify storage buckets (bounded, a slow MinIO shouldn't hang boot)
+    started = time.perf_counter()
+    await storage.verify_buckets(
+        BUCKET_NAME, "notes", timeout=settings.MINIO_STARTUP_TIMEOUT
+    )
+    record_startup("bucket_verify", time.perf_counter() - started)
+
     # STARTUP: verify DB connection
-    with engine.connect() as conn:
-        conn.execute(text("SELECT 1"))
+    started = time.perf_counter()
+    await _check_db()
+    record_startup("db_check", time.perf_counter() - started)
+
+    # STARTUP: fetch auth signing keys now rather than on the first request
+    started = time.perf_counter()
+    await jwks.start()
+    record_startup("jwks_fetch", time.perf_counter() - started)
+
+    counters.start()
+    view_dedup.start()
+    await jobs.start()
+
+    record_startup("cold_start", time.perf_counter() - PROCESS_START)
     yield
-    # SHUTDOWN: nothing to dispose of explicitly
+    # SHUTDOWN: let running jobs finish, write buffered view/download counts, then
+    # release the storage thread pool and async DB connections
+    await jobs.stop()
+    await counters.stop()
+    await view_dedup.stop()
+    await jwks.stop()
+    storage.shutdown()
+    await async_engine.dispose()
+
+
+async def _check_db() -> None:
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
 
 
 app = FastAPI(title="SwampNotes API", lifespan=lifespan)
@@ -31,6 +66,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],  # keyset pagination cursor
 )
 
 # Routers
@@ -0,0 +1,30 @@
+import os
+import time
+
+# Process-level timings, exposed via /health/startup so we can see how fast a fresh
+# worker becomes ready when scaling out
+
+
+def _process_start() -> float:
+    # When the OS created this process, on the perf_counter clock: interpreter startup
+    # and the imports before this module count too. Linux only (/proc), elsewhere
+    # falls back to the time this module is imported
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime, clock ticks since boot); comm may contain spaces
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        age = uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter()
+    return time.perf_counter() - max(age, 0.0)
+
+
+PROCESS_START = _process_start()
+
+startup: dict[str, float] = {}
+
+
+def record_startup(step: str, seconds: float) -> None:
+    startup[f"{step}_seconds"] = round(seconds, 4)
@@ -1,10 +1,29 @@
 import io
+import threading
+import time
+from collections.abc import Iterator
+from datetime import timezone
+from email.utils import format_datetime
+from typing import List, Optional, Tuple, Union
+from urllib.parse import quote
+
 import boto3
 from botocore.exceptions import ClientError
 from botocore.config import Config
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
+from .metrics import record_startup
 from .settings import settings
 
+# Chunk size used when proxying object bodies, keeps per-download memory small
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# PDFs must start with this marker (allowed anywhere in the first 1024 bytes)
+PDF_MAGIC = b"%PDF-"
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
 
 # add extension to MINIO_ENDPOINT if necessary (less strict)
 def _endpoint_base() -> str:
@@ -12,32 +31,57 @@ def _endpoint_base() -> str:
     return e if e.startswith("http://") or e.startswith("https://") else f"http://{e}"
 
 
-s3 = boto3.client(
-    "s3",
-    endpoint_url=_endpoint_base(),
-    aws_access_key_id=settings.MINIO_ACCESS_KEY,
-    aws_secret_access_key=settings.MINIO_SECRET_KEY,
-    region_name="us-east-1",
-    config=Config(
-        signature_version="s3v4",
-        s3={"addressing_style": "path"} if settings.MINIO_FORCE_PATH_STYLE else None,
-    ),
-)
+_s3 = None
+_s3_lock = threading.Lock()
+
 
-# Export s3 client as minio_client for compatibility
-minio_client = s3
+def get_s3_client():
+    """
+    Lazily build the boto3 client on first use and cache it for the process.
+    Keeps imports cheap (worker boot, test collection) and avoids any network I/O.
+    """
+    global _s3
+    if _s3 is None:
+        with _s3_lock:
+            if _s3 is None:
+                started = time.perf_counter()
+                _s3 = boto3.client(
+                    "s3",
+                    endpoint_url=_endpoint_base(),
+                    aws_access_key_id=settings.MINIO_ACCESS_KEY,
+                    aws_secret_access_key=settings.MINIO_SECRET_KEY,
+                    region_name="us-east-1",
+                    config=Config(
+                        signature_version="s3v4",
+                        max_pool_connections=settings.MINIO_MAX_POOL_CONNECTIONS,
+                        s3=(
+                            {"addressing_style": "path"}
+                            if settings.MINIO_FORCE_PATH_STYLE
+                            else None
+                        ),
+                    ),
+                )
+                record_startup("s3_client_init", time.perf_counter() - started)
+    return _s3
+
+
+def __getattr__(name: str):
+    # `minio_client.s3` / `minio_client.minio_client` still work, built on first access
+    if name in ("s3", "minio_client"):
+        return get_s3_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def create_bucket(bucket_name):
     try:
-        s3.head_bucket(Bucket=bucket_name)
+        get_s3_client().head_bucket(Bucket=bucket_name)
     except ClientError:
-        s3.create_bucket(Bucket=bucket_name)
+        get_s3_client().create_bucket(Bucket=bucket_name)
 
 
 def upload_to_minio(file, filename, bucket_name):
     try:
-        s3.upload_fileobj(io.BytesIO(file), bucket_name, filename)
+        get_s3_client().upload_fileobj(io.BytesIO(file), bucket_name, filename)
         return True
     except ClientError as e:
         print(e)
@@ -49,7 +93,7 @@ def upload_bytes_to_minio(
 ) -> bool:
     # Upload bytes directly to MinIO
     try:
-        s3.upload_fileobj(
+        get_s3_client().upload_fileobj(
             io.BytesIO(data),
             bucket_name,
             filename,
@@ -61,19 +105,155 @@ def upload_bytes_to_minio(
         return False
 
 
+def is_pdf_header(head: bytes) -> bool:
+    # Sniff the first chunk instead of trusting the client's content type
+    return PDF_MAGIC in head[:1024]
+
+
+def _read_part(fileobj, size: int) -> bytes:
+    # read() on spooled/socket files may return short, keep going until `size` or EOF
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = fileobj.read(size - len(buf))
+        if not chunk:
+            break
+        buf += chunk
+    return bytes(buf)
+
+
+def upload_stream_to_minio(
+    fileobj,
+    filename: str,
+    bucket_name: str,
+    content_type: str = "application/pdf",
+    *,
+    max_bytes: Optional[int] = None,
+    part_size: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Upload a file-like object part by part using an S3 multipart upload, so only one
+    part is ever held in memory. Small files fall back to a single PUT.
+    Returns the number of bytes stored, None on storage errors.
+    Raises UploadTooLargeError (and aborts the upload) once max_bytes is exceeded.
+    """
+    part_size = part_size or settings.MINIO_MULTIPART_PART_SIZE
+
+    chunk = _read_part(fileobj, part_size)
+    if max_bytes is not None and len(chunk) > max_bytes:
+        raise UploadTooLargeError(f"File exceeds the {max_bytes} byte limit")
+    if len(chunk) < part_size:
+        try:
+            get_s3_client().put_object(
+                Bucket=bucket_name, Key=filename, Body=chunk, ContentType=content_type
+            )
+            return len(chunk)
+        except ClientError as e:
+            print(e)
+            return None
+
+    try:
+        upload_id = get_s3_client().create_multipart_upload(
+            Bucket=bucket_name, Key=filename, ContentType=content_type
+        )["UploadId"]
+    except ClientError as e:
+        print(e)
+        return None
+
+    parts = []
+    total = 0
+    try:
+        while chunk:
+            total += len(chunk)
+            if max_bytes is not None and total > max_bytes:
+                raise UploadTooLargeError(f"File exceeds the {max_bytes} byte limit")
+            part_number = len(parts) + 1
+            resp = get_s3_client().upload_part(
+                Bucket=bucket_name,
+                Key=filename,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=chunk,
+            )
+            parts.append({"ETag": resp["ETag"], "PartNumber": part_number})
+            chunk = _read_part(fileobj, part_size)
+
+        get_s3_client().complete_multipart_upload(
+            Bucket=bucket_name,
+            Key=filename,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+        return total
+    except BaseException as e:
+        # Don't leave orphaned parts behind
+        try:
+            get_s3_client().abort_multipart_upload(
+                Bucket=bucket_name, Key=filename, UploadId=upload_id
+            )
+        except ClientError as abort_error:
+            print(abort_error)
+        if isinstance(e, ClientError):
+            print(e)
+            return None
+        raise
+
+
 def delete_from_minio(filename, bucket_name):
     try:
-        s3.delete_object(Bucket=bucket_name, Key=filename)
+        get_s3_client().delete_object(Bucket=bucket_name, Key=filename)
+        return True
+    except ClientError as e:
+        print(e)
+        return False
+
+
+def list_objects_from_minio(
+    bucket_name: str, prefix: str = "", page_size: int = 1000
+) -> Iterator[List[dict]]:
+    # Yield list_objects_v2 pages (Key/Size/LastModified/...) without loading the whole listing
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=bucket_name, Prefix=prefix, PaginationConfig={"PageSize": page_size}
+    ):
+        yield page.get("Contents", [])
+
+
+def download_to_path(filename: str, bucket_name: str, path: str) -> bool:
+    # Download an object to a local file (e.g. for PyMuPDF) without holding it in memory
+    try:
+        get_s3_client().download_file(bucket_name, filename, path)
         return True
     except ClientError as e:
         print(e)
         return False
 
 
+def delete_many_from_minio(keys: List[str], bucket_name: str) -> Tuple[int, int]:
+    # Bulk delete in batches of 1000 (the S3 maximum per request). Returns (deleted, errors)
+    deleted = errors = 0
+    for i in range(0, len(keys), 1000):
+        batch = keys[i : i + 1000]
+        try:
+            resp = get_s3_client().delete_objects(
+                Bucket=bucket_name,
+                Delete={"Objects": [{"Key": k} for k in batch], "Quiet": True},
+            )
+        except ClientError as e:
+            print(e)
+            errors += len(batch)
+            continue
+        failed = resp.get("Errors", [])
+        for err in failed:
+            print(f"Failed to delete {err.get('Key')}: {err.get('Message')}")
+        errors += len(failed)
+        deleted += len(batch) - len(failed)
+    return deleted, errors
+
+
 def download_from_minio(filename, bucket_name):
     try:
         fileobj = io.BytesIO()
-        s3.download_fileobj(bucket_name, filename, fileobj)
+        get_s3_client().download_fileobj(bucket_name, filename, fileobj)
         fileobj.seek(0)
         return StreamingResponse(fileobj, media_type="application/octet-stream")
     except ClientError as e:
@@ -85,7 +265,7 @@ def get_file_from_minio(filename: str, bucket_name: str) -> io.BytesIO:
     # Get file as BytesIO object (for custom streaming)
     try:
         fileobj = io.BytesIO()
-        s3.download_fileobj(bucket_name, filename, fileobj)
+        get_s3_client().download_fileobj(bucket_name, filename, fileobj)
         fileobj.seek(0)
         return fileobj
     except ClientError as e:
@@ -93,29 +273,259 @@ def get_file_from_minio(filename: str, bucket_name: str) -> io.BytesIO:
         return None
 
 
+def head_from_minio(
+    filename: str, bucket_name: str, checksum: bool = False
+) -> Optional[dict]:
+    # Object metadata (size, ETag, content type) without fetching the body.
+    # checksum=True also returns the checksum stored with the upload (ChecksumSHA256)
+    params = {"Bucket": bucket_name, "Key": filename}
+    if checksum:
+        params["ChecksumMode"] = "ENABLED"
+    try:
+        return get_s3_client().head_object(**params)
+    except ClientError as e:
+        print(e)
+        return None
+
+
+def copy_within_minio(
+    src_key: str,
+    dest_key: str,
+    bucket_name: str,
+    src_bucket: Optional[str] = None,
+    content_type: str = "application/pdf",
+    if_match: Optional[str] = None,
+) -> bool:
+    # Server-side copy, the bytes never pass through the API. With if_match the copy
+    # fails if the source no longer has that ETag
+    params = {}
+    if if_match:
+        params["CopySourceIfMatch"] = if_match
+    try:
+        get_s3_client().copy_object(
+            Bucket=bucket_name,
+            Key=dest_key,
+            CopySource={"Bucket": src_bucket or bucket_name, "Key": src_key},
+            ContentType=content_type,
+            MetadataDirective="REPLACE",
+            **params,
+        )
+        return True
+    except ClientError as e:
+        print(e)
+        return False
+
+
+def read_range_from_minio(
+    filename: str,
+    bucket_name: str,
+    start: int,
+    end: int,
+    if_match: Optional[str] = None,
+) -> Optional[bytes]:
+    # Fetch only bytes start..end (inclusive), e.g. to sniff a file header
+    params = {"Bucket": bucket_name, "Key": filename, "Range": f"bytes={start}-{end}"}
+    if if_match:
+        params["IfMatch"] = if_match
+    try:
+        obj = get_s3_client().get_object(**params)
+        return obj["Body"].read()
+    except ClientError as e:
+        print(e)
+        return None
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single "bytes=start-end" Range header against an object of `size` bytes.
+    Returns an inclusive (start, end) pair, or None when the header should be ignored
+    (malformed or multi-range, we answer those with the full body).
+    Raises ValueError when the range can't be satisfied (-> 416).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_s, sep, end_s = (part.strip() for part in spec.partition("-"))
+    if not sep or not (start_s or end_s):
+        return None
+    if (start_s and not start_s.isdigit()) or (end_s and not end_s.isdigit()):
+        return None
+    if not start_s:
+        # Suffix range: the last N bytes
+        suffix = int(end_s)
+        if suffix == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - suffix, 0), size - 1
+    start = int(start_s)
+    end = int(end_s) if end_s else size - 1
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def _iter_body(body, chunk_size: int) -> Iterator[bytes]:
+    # Starlette iterates sync generators in its threadpool, so this doesn't block the event loop
+    try:
+        for chunk in body.iter_chunks(chunk_size):
+            yield chunk
+    finally:
+        body.close()
+
+
+def plan_ranged_response(
+    head: dict,
+    *,
+    range_header: Optional[str] = None,
+    if_range: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    headers: Optional[dict] = None,
+) -> Union[Response, Tuple[int, Optional[Tuple[int, int]], dict]]:
+    """
+    Work out status/headers for serving an object described by `head` (head_object
+    fields: ContentLength, ETag, LastModified) given the client's Range/If-Range and
+    If-None-Match. Returns a ready 304/416 Response, or
+    (status_code, byte_range, response_headers).
+    """
+    size = head["ContentLength"]
+    etag = head.get("ETag")
+    resp_headers = {"Accept-Ranges": "bytes", **(headers or {})}
+    if etag:
+        resp_headers["ETag"] = etag
+    if head.get("LastModified"):
+        resp_headers["Last-Modified"] = format_datetime(
+            head["LastModified"].astimezone(timezone.utc), usegmt=True
+        )
+
+    # Conditional GET: the client's cached copy is still current
+    if if_none_match and etag:
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=resp_headers)
+
+    # If-Range: only honor the Range if the client's copy is still current
+    use_range = bool(range_header) and (
+        if_range is None
+        or if_range.strip() in (etag, resp_headers.get("Last-Modified"))
+    )
+
+    byte_range = None
+    if use_range:
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            return Response(
+                status_code=416,
+                headers={**resp_headers, "Content-Range": f"bytes */{size}"},
+            )
+
+    if byte_range:
+        start, end = byte_range
+        resp_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        resp_headers["Content-Length"] = str(end - start + 1)
+        return 206, byte_range, resp_headers
+    resp_headers["Content-Length"] = str(size)
+    return 200, None, resp_headers
+
+
+def stream_from_minio(
+    filename: str,
+    bucket_name: str,
+    *,
+    range_header: Optional[str] = None,
+    if_range: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    media_type: str = "application/octet-stream",
+    headers: Optional[dict] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    head: Optional[dict] = None,
+) -> Optional[Response]:
+    """
+    Stream an object straight from S3 to the client in small chunks.
+    Honors single Range requests (206 Partial Content) and If-Range, so PDF viewers
+    can fetch page by page. Returns None if the object can't be found/read.
+    Pass `head` if the caller already has the object's metadata.
+    """
+    head = head or head_from_minio(filename, bucket_name)
+    if head is None:
+        return None
+
+    plan = plan_ranged_response(
+        head,
+        range_header=range_header,
+        if_range=if_range,
+        if_none_match=if_none_match,
+        headers=headers,
+    )
+    if isinstance(plan, Response):
+        return plan
+    status_code, byte_range, resp_headers = plan
+
+    params = {"Bucket": bucket_name, "Key": filename}
+    if head.get("ETag"):
+        # Guard against the object being replaced between HEAD and GET
+        params["IfMatch"] = head["ETag"]
+    if byte_range:
+        params["Range"] = f"bytes={byte_range[0]}-{byte_range[1]}"
+
+    try:
+        obj = get_s3_client().get_object(**params)
+    except ClientError as e:
+        print(e)
+        return None
+
+    return StreamingResponse(
+        _iter_body(obj["Body"], chunk_size),
+        status_code=status_code,
+        media_type=media_type,
+        headers=resp_headers,
+    )
+
+
 # Presign URLs (grants temp access to a private object in the storage bucket)
-def presign_put(key: str, content_type: str, expires: int = 300) -> str:
-    return s3.generate_presigned_url(
-        "put_object",
-        Params={
-            "Bucket": settings.MINIO_BUCKET,
-            "Key": key,
-            "ContentType": content_type,
-        },
-        ExpiresIn=expires,
+def presign_put(
+    key: str,
+    content_type: str,
+    expires: int = 300,
+    bucket_name: Optional[str] = None,
+    checksum_sha256: Optional[str] = None,
+) -> str:
+    params = {
+        "Bucket": bucket_name or settings.MINIO_BUCKET,
+        "Key": key,
+        "ContentType": content_type,
+    }
+    if checksum_sha256:
+        # Signed in as x-amz-checksum-sha256: the PUT must send that header and S3
+        # rejects a body that doesn't match it
+        params["ChecksumSHA256"] = checksum_sha256
+    return get_s3_client().generate_presigned_url(
+        "put_object", Params=params, ExpiresIn=expires
     )
 
 
-def presign_get(key: str, expires: int = 300) -> str:
-    return s3.generate_presigned_url(
-        "get_object",
-        Params={"Bucket": settings.MINIO_BUCKET, "Key": key},
-        ExpiresIn=expires,
+def presign_get(
+    key: str,
+    expires: int = 300,
+    bucket_name: Optional[str] = None,
+    filename: Optional[str] = None,
+    content_type: Optional[str] = None,
+) -> str:
+    # filename/content_type are baked into the signed URL so MinIO serves the right headers
+    params = {"Bucket": bucket_name or settings.MINIO_BUCKET, "Key": key}
+    if filename:
+        params["ResponseContentDisposition"] = content_disposition(filename)
+    if content_type:
+        params["ResponseContentType"] = content_type
+    return get_s3_client().generate_presigned_url(
+        "get_object", Params=params, ExpiresIn=expires
     )
 
 
-# Ensure notes bucket exists on startup
-try:
-    create_bucket("notes")
-except Exception as e:
-    print(f"Warning: Could not create/verify notes bucket: {e}")
+def content_disposition(filename: str) -> str:
+    # Attachment header with an ASCII fallback plus the RFC 5987 UTF-8 name
+    fallback = (
+        filename.encode("ascii", "replace").decode().replace('"', "'").replace("?", "_")
+    )
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
@@ -1,7 +1,21 @@
 from datetime import datetime, timezone
 from typing import List, Optional
+from sqlalchemy import Column, Computed, DateTime, Double, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlmodel import SQLModel, Field, Relationship
 
+# Weighted full-text document for notes: title > course name > description
+# Kept in sync by Postgres itself (generated column), indexed with GIN
+NOTE_SEARCH_CONFIG = "english"
+NOTE_SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{NOTE_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{NOTE_SEARCH_CONFIG}', coalesce(course_name, '')), 'B') || "
+    f"setweight(to_tsvector('{NOTE_SEARCH_CONFIG}', coalesce(description, '')), 'C')"
+)
+
+# Average rating from the denormalized count/sum, 0 for unrated notes
+NOTE_RATING_AVG = "coalesce(rating_sum / nullif(rating_count, 0), 0)"
+
 
 # Basic model for a user
 class User(SQLModel, table=True):
@@ -40,6 +54,22 @@ class Course(SQLModel, table=True):
     title: str
     school: str
 
+    # Trigram indexes for typo-tolerant course lookup (needs the pg_trgm extension)
+    __table_args__ = (
+        Index(
+            "ix_course_code_trgm",
+            "code",
+            postgresql_using="gin",
+            postgresql_ops={"code": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_course_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+    )
+
 
 # Note object skeleton
 class Note(SQLModel, table=True):
@@ -60,6 +90,50 @@ class Note(SQLModel, table=True):
     price: int = Field(default=100)  # Points required to purchase
     is_free: bool = Field(default=False)  # Allow free notes
     purchases: List["Purchase"] = Relationship(back_populates="note")
+    # Generated by the database, never written by the app or sent to clients
+    search_vector: Optional[str] = Field(
+        default=None,
+        exclude=True,
+        sa_column=Column(TSVECTOR, Computed(NOTE_SEARCH_VECTOR, persisted=True)),
+    )
+    # Rating aggregates, maintained by rate_note/delete_rating in the same transaction
+    # as the Rating row so listings can show and sort by rating without a join
+    rating_count: int = 0
+    rating_sum: float = 0
+    rating_avg: Optional[float] = Field(
+        default=None,
+        sa_column=Column(Double, Computed(NOTE_RATING_AVG, persisted=True)),
+    )
+
+    __table_args__ = (
+        Index("ix_note_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_note_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        # Keyset pagination, newest first (globally, per course, per author)
+        Index("ix_note_created_at_id", "created_at", "id"),
+        Index("ix_note_course_id_created_at_id", "course_id", "created_at", "id"),
+        Index("ix_note_author_id_created_at_id", "author_id", "created_at", "id"),
+        # Best rated first (globally, per course)
+        Index(
+            "ix_note_rating_avg_rating_count_created_at_id",
+            "rating_avg",
+            "rating_count",
+            "created_at",
+            "id",
+        ),
+        Index(
+            "ix_note_course_id_rating_avg_rating_count_created_at_id",
+            "course_id",
+            "rating_avg",
+            "rating_count",
+            "created_at",
+            "id",
+        ),
+    )
 
 
 # Ratings object skeleton
@@ -74,6 +148,13 @@ class Rating(SQLModel, table=True):
     author: Optional[User] = Relationship()
     note: Optional[Note] = Relationship(back_populates="ratings")
 
+    __table_args__ = (
+        # One rating per user and note, rating again replaces it
+        UniqueConstraint("author_id", "note_id", name="uq_rating_author_id_note_id"),
+        # Keyset pagination of a note's ratings, newest first
+        Index("ix_rating_note_id_created_at_id", "note_id", "created_at", "id"),
+    )
+
 
 # Purchase object skeleton, tracks note purchases by users
 class Purchase(SQLModel, table=True):
@@ -87,6 +168,56 @@ class Purchase(SQLModel, table=True):
     user: Optional[User] = Relationship()
     note: Optional[Note] = Relationship()
 
-    class Config:
-        # Prevent duplicate purchases
-        table_args = ({"schema": None},)
+    __table_args__ = (
+        # Prevent duplicate purchases (create_purchase relies on it)
+        UniqueConstraint("user_id", "note_id", name="uq_purchase_user_id_note_id"),
+        # Keyset pagination of a user's library, most recent purchase first
+        Index("ix_purchase_user_id_purchased_at_id", "user_id", "purchased_at", "id"),
+    )
+
+
+# Content-addressed stored file, shared by every Note uploaded with identical bytes
+class Blob(SQLModel, table=True):
+    sha256: str = Field(primary_key=True)
+    object_key: str = Field(index=True, unique=True)
+    size: int
+    ref_count: int = 0  # number of Notes pointing at object_key
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Last acquire_blob: a reference newer than the GC grace may not have its Note yet
+    acquired_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+# Last counted view per user and note, shared by all workers for view de-duplication.
+# UNLOGGED: cheap writes, and losing it in a crash only means a few recounted views
+class NoteView(SQLModel, table=True):
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    user_id: int = Field(primary_key=True)
+    note_id: int = Field(primary_key=True)
+    viewed_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False, index=True)
+    )
+
+
+# Durable background job (e.g. note transcription), run by the in-process worker pool
+# in jobs.py. Queued rows survive restarts; workers claim them with SKIP LOCKED
+class Job(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    kind: str
+    note_id: Optional[int] = Field(
+        default=None, foreign_key="note.id", ondelete="CASCADE", index=True
+    )
+    status: str = Field(default="queued")  # queued, running, done, failed
+    payload: dict = Field(default_factory=dict, sa_column=Column(JSONB, nullable=False))
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None  # bumped by the worker while it runs
+    run_after: Optional[datetime] = None  # retry backoff, not claimed before this
+
+    __table_args__ = (
+        # Claiming the oldest queued job
+        Index("ix_job_status_id", "status", "id"),
+    )
@@ -0,0 +1,355 @@
+import hashlib
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from botocore.exceptions import ClientError
+from fastapi.responses import Response, StreamingResponse
+
+from . import minio_client
+from .settings import settings
+
+# Hot-object cache tier in front of MinIO
+# A few notes (study guides etc.) get most of the downloads, so we keep local copies on
+# disk (and optionally in memory) keyed by bucket + object_key + ETag. Entries are
+# revalidated against head_object every OBJECT_CACHE_REVALIDATE_SECONDS and evicted LRU
+# once the size budget is exceeded. Misses are served straight from S3 while the object
+# is copied into the cache in the background. Each worker process keeps its own index
+# and files in a <host>-<pid> subdirectory of OBJECT_CACHE_DIR, with an equal share of
+# the disk budget, so workers never delete each other's in-use files.
+
+
+@dataclass
+class _Entry:
+    head: dict  # ContentLength/ETag/LastModified from head_object
+    path: str
+    checked_at: float
+    data: Optional[bytes] = None  # set when the object is also in the memory tier
+
+    @property
+    def size(self) -> int:
+        return self.head["ContentLength"]
+
+
+class ObjectCache:
+    def __init__(
+        self,
+        directory: str,
+        *,
+        max_bytes: int,
+        max_object_bytes: int,
+        memory_bytes: int = 0,
+        revalidate_seconds: float = 30,
+    ):
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self.memory_bytes = memory_bytes
+        self.revalidate_seconds = revalidate_seconds
+
+        self._entries: "OrderedDict[tuple[str, str], _Entry]" = OrderedDict()
+        self._disk_used = 0
+        self._memory_used = 0
+        self._filling: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self._filler = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="object-cache"
+        )
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+
+        # We don't persist the index, so anything left from a previous run is unusable.
+        # Only our own directory and those of dead workers on this host are cleared
+        os.makedirs(directory, exist_ok=True)
+        _remove_dead_worker_dirs(directory)
+        self.directory = os.path.join(directory, _worker_dir_name(os.getpid()))
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "disk_bytes": self._disk_used,
+                "memory_bytes": self._memory_used,
+            }
+
+    def lookup(self, bucket: str, key: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get((bucket, key))
+            if entry is not None:
+                self._entries.move_to_end((bucket, key))
+        if entry is None:
+            return None
+        if time.monotonic() - entry.checked_at < self.revalidate_seconds:
+            return entry
+
+        # Conditional revalidation: a cheap HEAD, keep our copy if the ETag still matches
+        head = minio_client.head_from_minio(key, bucket)
+        with self._lock:
+            self.revalidations += 1
+        if head is not None and head.get("ETag") == entry.head.get("ETag"):
+            entry.checked_at = time.monotonic()
+            return entry
+        self.invalidate(bucket, key)
+        return None
+
+    def invalidate(self, bucket: str, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop((bucket, key), None)
+            if entry is not None:
+                self._drop(entry)
+
+    def schedule_fill(self, bucket: str, key: str, head: dict) -> None:
+        # Copy the object into the cache in the background (one fill per key at a time)
+        if head["ContentLength"] > self.max_object_bytes:
+            return
+        with self._lock:
+            if (bucket, key) in self._filling:
+                return
+            self._filling.add((bucket, key))
+        self._filler.submit(self._fill, bucket, key, head)
+
+    def serve(
+        self,
+        entry: _Entry,
+        *,
+        range_header: Optional[str] = None,
+        if_range: Optional[str] = None,
+        if_none_match: Optional[str] = None,
+        media_type: str = "application/octet-stream",
+        headers: Optional[dict] = None,
+        chunk_size: int = minio_client.STREAM_CHUNK_SIZE,
+    ) -> Optional[Response]:
+        plan = minio_client.plan_ranged_response(
+            entry.head,
+            range_header=range_header,
+            if_range=if_range,
+            if_none_match=if_none_match,
+            headers=headers,
+        )
+        if isinstance(plan, Response):
+            return plan
+        status_code, byte_range, resp_headers = plan
+        start, end = byte_range or (0, entry.size - 1)
+
+        data = entry.data
+        if data is not None:
+            body = _iter_memory(memoryview(data)[start : end + 1], chunk_size)
+        else:
+            # Open now, so a concurrent eviction (unlink) can't pull the file from under us
+            try:
+                f = open(entry.path, "rb")
+            except OSError:
+                return None
+            body = _iter_file(f, start, end - start + 1, chunk_size)
+
+        return StreamingResponse(
+            body, status_code=status_code, media_type=media_type, headers=resp_headers
+        )
+
+    def stream(self, bucket: str, key: str, **kwargs) -> Optional[Response]:
+        # Serve from the cache, or stream from S3 and queue the object for caching
+        entry = self.lookup(bucket, key)
+        if entry is not None:
+            response = self.serve(entry, **kwargs)
+            if response is not None:
+                with self._lock:
+                    self.hits += 1
+                return response
+
+        with self._lock:
+            self.misses += 1
+        head = minio_client.head_from_minio(key, bucket)
+        if head is None:
+            return None
+        self.schedule_fill(bucket, key, head)
+        return minio_client.stream_from_minio(key, bucket, head=head, **kwargs)
+
+    def shutdown(self) -> None:
+        self._filler.shutdown(wait=False, cancel_futures=True)
+
+    def _fill(self, bucket: str, key: str, head: dict) -> None:
+        # The key stays in _filling until the entry is in the index, so a concurrent
+        # miss never starts a second download
+        try:
+            self._fill_entry(bucket, key, head)
+        finally:
+            with self._lock:
+                self._filling.discard((bucket, key))
+
+    def _fill_entry(self, bucket: str, key: str, head: dict) -> None:
+        etag = head.get("ETag") or ""
+        name = hashlib.sha256(f"{bucket}/{key}/{etag}".encode()).hexdigest()
+        path = os.path.join(self.directory, f"{name}.obj")
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            params = {"Bucket": bucket, "Key": key}
+            if etag:
+                params["IfMatch"] = etag
+            obj = minio_client.get_s3_client().get_object(**params)
+            with os.fdopen(fd, "wb") as f:
+                for chunk in obj["Body"].iter_chunks(minio_client.STREAM_CHUNK_SIZE):
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+
+            data = None
+            if self.memory_bytes and head["ContentLength"] <= self.memory_bytes // 4:
+                with open(path, "rb") as f:
+                    data = f.read()
+        except (ClientError, OSError) as e:
+            print(e)
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+
+        entry = _Entry(
+            head={
+                "ContentLength": head["ContentLength"],
+                "ETag": head.get("ETag"),
+                "LastModified": head.get("LastModified"),
+            },
+            path=path,
+            checked_at=time.monotonic(),
+            data=data,
+        )
+        with self._lock:
+            old = self._entries.pop((bucket, key), None)
+            if old is not None and old.path != path:
+                self._drop(old)
+            elif old is not None:
+                # Same file was re-filled in place, only undo the accounting
+                self._disk_used -= old.size
+                self._memory_used -= old.size if old.data is not None else 0
+            self._entries[(bucket, key)] = entry
+            self._disk_used += entry.size
+            if data is not None:
+                self._memory_used += entry.size
+            self._evict()
+
+    def _evict(self) -> None:
+        # Caller holds the lock; oldest entries go first
+        while self._disk_used > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._drop(entry)
+            self.evictions += 1
+        for entry in self._entries.values():
+            if self._memory_used <= self.memory_bytes:
+                break
+            if entry.data is not None:
+                entry.data = None
+                self._memory_used -= entry.size
+
+    def _drop(self, entry: _Entry) -> None:
+        # Caller holds the lock
+        self._disk_used -= entry.size
+        if entry.data is not None:
+            self._memory_used -= entry.size
+            entry.data = None
+        try:
+            os.unlink(entry.path)
+        except OSError:
+            pass
+
+
+def _worker_dir_name(pid: int) -> str:
+    return f"{socket.gethostname()}-{pid}"
+
+
+def _remove_dead_worker_dirs(directory: str) -> None:
+    # Directories left by workers on this host that have since exited
+    prefix = f"{socket.gethostname()}-"
+    for name in os.listdir(directory):
+        pid = name[len(prefix) :]
+        if not name.startswith(prefix) or not pid.isdigit():
+            continue
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        except OSError:
+            pass  # alive, owned by another user
+
+
+def _iter_memory(view: memoryview, chunk_size: int):
+    for offset in range(0, len(view), chunk_size):
+        yield view[offset : offset + chunk_size]
+
+
+def _iter_file(f, start: int, length: int, chunk_size: int):
+    try:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+_cache: Optional[ObjectCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[ObjectCache]:
+    # The cache is opt-in: only enabled when OBJECT_CACHE_DIR is set
+    global _cache
+    if _cache is None and settings.OBJECT_CACHE_DIR:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ObjectCache(
+                    settings.OBJECT_CACHE_DIR,
+                    # Every worker on the host shares the disk budget
+                    max_bytes=settings.OBJECT_CACHE_MAX_BYTES
+                    // max(settings.WEB_CONCURRENCY, 1),
+                    max_object_bytes=settings.OBJECT_CACHE_MAX_OBJECT_BYTES,
+                    memory_bytes=settings.OBJECT_CACHE_MEMORY_BYTES,
+                    revalidate_seconds=settings.OBJECT_CACHE_REVALIDATE_SECONDS,
+                )
+    return _cache
+
+
+def stream_from_cache(filename: str, bucket_name: str, **kwargs) -> Optional[Response]:
+    """
+    Same contract as minio_client.stream_from_minio, but serves hot objects from the
+    local cache when it's enabled
+    """
+    cache = get_cache()
+    if cache is None:
+        return minio_client.stream_from_minio(filename, bucket_name, **kwargs)
+    return cache.stream(bucket_name, filename, **kwargs)
+
+
+def invalidate(filename: str, bucket_name: str) -> None:
+    cache = get_cache()
+    if cache is not None:
+        cache.invalidate(bucket_name, filename)
+
+
+def cache_stats() -> dict:
+    cache = get_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+def shutdown() -> None:
+    if _cache is not None:
+        _cache.shutdown()
@@ -0,0 +1,134 @@
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Type
+
+import pymupdf
+
+from .settings import settings
+
+# OCR backends for note transcription
+# A backend turns a PDF into pages of positioned paragraphs, transcribe.py overlays
+# them on the document. One backend instance per process, reused by every job, so
+# clients and credentials are set up once. OCR_BACKEND="documentai" calls Google
+# Document AI, "local" reads the PDF's own text layer with PyMuPDF: no network or
+# credentials, for tests and benchmarks of the transcription pipeline.
+
+
+@dataclass
+class OcrParagraph:
+    # Bounding box, top-left origin, in the page's units
+    x1: float
+    y1: float
+    x2: float
+    y2: float
+    text: str
+
+
+@dataclass
+class OcrPage:
+    width: float
+    height: float
+    paragraphs: List[OcrParagraph] = field(default_factory=list)
+
+
+class OcrBackend(ABC):
+    name = ""
+
+    @abstractmethod
+    def recognize(self, raw_bytes: bytes) -> List[OcrPage]: ...
+
+
+class DocumentAiBackend(OcrBackend):
+    name = "documentai"
+
+    def __init__(self):
+        # Google client libraries are only needed (and imported) for this backend
+        from google.api_core.client_options import ClientOptions
+        from google.cloud import documentai_v1
+        from google.oauth2 import service_account
+
+        location = settings.DOCUMENT_AI_LOCATION
+        credentials = None
+        if settings.DOCUMENT_AI_CREDENTIALS_FILE:
+            credentials = service_account.Credentials.from_service_account_file(
+                settings.DOCUMENT_AI_CREDENTIALS_FILE
+            )
+        self._documentai = documentai_v1
+        # Source for accessing the API: https://docs.cloud.google.com/document-ai/docs/send-request#documentai_process_document-python
+        self.client = documentai_v1.DocumentProcessorServiceClient(
+            client_options=ClientOptions(
+                api_endpoint=f"{location}-documentai.googleapis.com"
+            ),
+            credentials=credentials,
+        )
+        # Built locally, no get_processor round trip per document
+        self.processor_name = self.client.processor_path(
+            settings.DOCUMENT_AI_PROJECT_ID, location, settings.DOCUMENT_AI_PROCESSOR_ID
+        )
+
+    def recognize(self, raw_bytes: bytes) -> List[OcrPage]:
+        documentai = self._documentai
+        request = documentai.ProcessRequest(
+            name=self.processor_name,
+            raw_document=documentai.RawDocument(
+                content=raw_bytes, mime_type="application/pdf"
+            ),
+        )
+        document = self.client.process_document(request=request).document
+
+        pages = []
+        for page in document.pages:
+            # Opposite corners of the bounding polygon
+            vertices = page.layout.bounding_poly.vertices
+            p1, p2 = vertices[0], vertices[2]
+            result = OcrPage(width=abs(p1.x - p2.x), height=abs(p1.y - p2.y))
+            for paragraph in page.paragraphs:
+                vertices = paragraph.layout.bounding_poly.vertices
+                c1, c2 = vertices[0], vertices[2]
+                segment = paragraph.layout.text_anchor.text_segments[0]
+                text = document.text[int(segment.start_index) : int(segment.end_index)]
+                result.paragraphs.append(
+                    OcrParagraph(c1.x, c1.y, c2.x, c2.y, text.strip())
+                )
+            pages.append(result)
+        return pages
+
+
+class LocalBackend(OcrBackend):
+    name = "local"
+
+    def recognize(self, raw_bytes: bytes) -> List[OcrPage]:
+        # Text blocks from the PDF's text layer (scans without one come back empty)
+        pages = []
+        with pymupdf.open(stream=raw_bytes, filetype="pdf") as doc:
+            for page in doc:
+                result = OcrPage(width=page.rect.width, height=page.rect.height)
+                for x1, y1, x2, y2, text, _, block_type in page.get_text("blocks"):
+                    if block_type == 0 and text.strip():
+                        result.paragraphs.append(
+                            OcrParagraph(x1, y1, x2, y2, " ".join(text.split()))
+                        )
+                pages.append(result)
+        return pages
+
+
+BACKENDS: Dict[str, Type[OcrBackend]] = {
+    DocumentAiBackend.name: DocumentAiBackend,
+    LocalBackend.name: LocalBackend,
+}
+
+_backend: Optional[OcrBackend] = None
+_lock = threading.Lock()
+
+
+def get_backend() -> OcrBackend:
+    # Process-wide instance for OCR_BACKEND, created on first use
+    global _backend
+    with _lock:
+        if _backend is None or _backend.name != settings.OCR_BACKEND:
+            backend_cls = BACKENDS.get(settings.OCR_BACKEND)
+            if backend_cls is None:
+                raise ValueError(f"Unknown OCR_BACKEND {settings.OCR_BACKEND}")
+            _backend = backend_cls()
+        return _backend
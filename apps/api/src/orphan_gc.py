@@ -0,0 +1,179 @@
+"""
+Garbage-collect orphaned objects from the notes bucket.
+
+Objects end up orphaned when create_note fails after an upload, when a presigned
+upload (/files/presign-upload) is never finalized, or when a process dies between
+acquire_blob and create_note (leaving a Blob reference no Note holds). This pages
+through the bucket, checks each page of keys against Note.object_key (and recently
+acquired Blob references), and bulk deletes anything unreferenced that is older than
+the grace period. Each batch is re-checked with its Blob rows locked right before
+deleting, so a concurrent upload of the same file can't lose its object.
+
+Run (from apps/api):
+python -m src.orphan_gc --dry-run
+python -m src.orphan_gc --grace-hours 24 --bucket notes
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlmodel import Session, delete, or_, select
+
+from . import minio_client, object_cache, previews
+from .db import engine
+from .models import Blob, Note
+
+MAX_DELETE_BATCH = 1000  # S3 delete_objects limit
+
+
+@dataclass
+class GCStats:
+    scanned: int = 0
+    too_young: int = 0
+    referenced: int = 0
+    orphans: int = 0
+    orphan_bytes: int = 0
+    deleted: int = 0
+    errors: int = 0
+    elapsed_seconds: float = 0.0
+    objects_per_second: float = 0.0
+
+
+def _referenced_keys(
+    session: Session, keys: List[str], cutoff: datetime, lock: bool = False
+) -> set[str]:
+    # Set-membership check for one page of keys, instead of loading every Note key.
+    # Thumbnail/preview renditions are alive as long as their source object is
+    sources = {key: previews.source_key(key) or key for key in keys}
+    lookup = list(set(sources.values()))
+    if lock:
+        # Blocks acquire_blob for these digests until the batch is committed
+        session.exec(
+            select(Blob.sha256)
+            .where(Blob.object_key.in_(lookup))
+            .order_by(Blob.sha256)
+            .with_for_update()
+        ).all()
+    note_keys = session.exec(select(Note.object_key).where(Note.object_key.in_(lookup)))
+    # Recently acquired references cover uploads whose Note is still being created.
+    # Older ones without a Note leaked (the process died before create_note)
+    blob_keys = session.exec(
+        select(Blob.object_key).where(
+            Blob.object_key.in_(lookup),
+            Blob.ref_count > 0,
+            Blob.acquired_at >= cutoff,
+        )
+    )
+    alive = set(note_keys) | set(blob_keys)
+    return {key for key, source in sources.items() if source in alive}
+
+
+def _delete_batch(
+    session: Session, keys: List[str], bucket: str, cutoff: datetime, stats: GCStats
+):
+    # The page was checked a while ago: check again with the blob rows locked, delete
+    # the objects, then their rows. An upload of the same file waiting on the lock
+    # then finds no row and stores the bytes again
+    referenced = _referenced_keys(session, keys, cutoff, lock=True)
+    stats.referenced += len(referenced)
+    stats.orphans -= len(referenced)
+    keys = [key for key in keys if key not in referenced]
+    if not keys:
+        session.commit()
+        return
+
+    deleted, errors = minio_client.delete_many_from_minio(keys, bucket)
+    stats.deleted += deleted
+    stats.errors += errors
+    for key in keys:
+        object_cache.invalidate(key, bucket)
+    # Drop dead blob rows so a future identical upload re-uploads the bytes
+    session.exec(
+        delete(Blob).where(
+            Blob.object_key.in_(keys),
+            or_(Blob.ref_count <= 0, Blob.acquired_at < cutoff),
+        )
+    )
+    session.commit()
+
+
+def collect_orphans(
+    bucket: str,
+    *,
+    grace: timedelta = timedelta(hours=24),
+    prefix: str = "",
+    dry_run: bool = False,
+    batch_size: int = MAX_DELETE_BATCH,
+) -> GCStats:
+    batch_size = min(batch_size, MAX_DELETE_BATCH)
+    cutoff = datetime.now(timezone.utc) - grace
+    stats = GCStats()
+    started = time.perf_counter()
+    pending: List[str] = []
+
+    with Session(engine) as session:
+        for page in minio_client.list_objects_from_minio(bucket, prefix=prefix):
+            stats.scanned += len(page)
+            old = [obj for obj in page if obj["LastModified"] < cutoff]
+            stats.too_young += len(page) - len(old)
+            if not old:
+                continue
+
+            referenced = _referenced_keys(session, [obj["Key"] for obj in old], cutoff)
+            # Don't hold a snapshot or locks while listing the next page
+            session.commit()
+            stats.referenced += len(referenced)
+            for obj in old:
+                if obj["Key"] in referenced:
+                    continue
+                stats.orphans += 1
+                stats.orphan_bytes += obj.get("Size", 0)
+                if dry_run:
+                    print(f"[dry-run] would delete {obj['Key']}")
+                    continue
+                pending.append(obj["Key"])
+                if len(pending) >= batch_size:
+                    _delete_batch(session, pending, bucket, cutoff, stats)
+                    pending = []
+
+        if pending:
+            _delete_batch(session, pending, bucket, cutoff, stats)
+
+    stats.elapsed_seconds = round(time.perf_counter() - started, 3)
+    if stats.elapsed_seconds:
+        stats.objects_per_second = round(stats.scanned / stats.elapsed_seconds, 1)
+    return stats
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Delete orphaned note objects")
+    parser.add_argument("--bucket", default="notes")
+    parser.add_argument("--prefix", default="")
+    parser.add_argument(
+        "--grace-hours",
+        type=float,
+        default=24,
+        help="only delete orphans older than this (in-flight uploads are younger)",
+    )
+    parser.add_argument("--batch-size", type=int, default=MAX_DELETE_BATCH)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    stats = collect_orphans(
+        args.bucket,
+        grace=timedelta(hours=args.grace_hours),
+        prefix=args.prefix,
+        dry_run=args.dry_run,
+        batch_size=args.batch_size,
+    )
+    for name, value in asdict(stats).items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .settings import settings
+
+# Postgres connection pooling
+# Pool sizing comes from Settings so it can be matched to the worker count (every worker
+# gets its own sync + async pool, keep workers * (size + overflow) * 2 under
+# max_connections, or PgBouncer's pool). The pools time how long each checkout waits,
+# so queueing on the pool shows up in /health/db before it shows up as timeouts.
+
+
+class _TimedPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        # Blocks while the pool is exhausted (up to pool_timeout), so this is the wait
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "size": self.size(),
+                "checked_out": self.checkedout(),
+                "checked_in": self.checkedin(),
+                "overflow": max(self.overflow(), 0),
+                "max_overflow": self._max_overflow,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 4),
+                "wait_seconds_max": round(self.wait_seconds_max, 4),
+                "wait_seconds_avg": (
+                    round(self.wait_seconds_total / self.checkouts, 6)
+                    if self.checkouts
+                    else 0.0
+                ),
+            }
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(*, is_async: bool = False) -> dict:
+    """
+    Keyword arguments for create_engine / create_async_engine from Settings.
+    With DB_PGBOUNCER (transaction pooling) server-side prepared statements are
+    turned off: the next transaction may land on a different server connection.
+    """
+    options = dict(
+        poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+    if settings.DB_PGBOUNCER:
+        options["connect_args"] = {"prepare_threshold": None}
+    return options
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    if isinstance(pool, _TimedPoolMixin):
+        return pool.stats()
+    return {"status": pool.status()}
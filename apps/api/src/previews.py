@@ -0,0 +1,151 @@
+import os
+import tempfile
+import threading
+from typing import Optional
+
+import pymupdf  # PyMuPDF, imported as `fitz` in transcribe.py
+
+from . import minio_client
+from .settings import settings
+from .ttl_cache import TTLCache
+
+# First-page thumbnails and watermarked previews for notes
+# Renditions are rendered once (at upload time or lazily on first request) and stored next
+# to the note object under renditions/<object_key>/, so browsing a course page never has
+# to fetch full PDFs. Content-addressed objects share their renditions too.
+
+THUMBNAIL_WIDTH = 320  # px
+PREVIEW_PAGES = 2
+PREVIEW_WATERMARK = "SwampNotes Preview"
+
+THUMBNAIL = "thumb.png"
+PREVIEW = "preview.pdf"
+RENDITION_PREFIX = "renditions/"
+
+RENDITION_TYPES = {THUMBNAIL: "image/png", PREVIEW: "application/pdf"}
+
+# One render per object at a time, concurrent requests wait for the first one. Each
+# lock counts its holder and waiters and is dropped once the last one is done
+_render_locks: dict[str, list] = {}  # object_key -> [lock, users]
+_render_locks_guard = threading.Lock()
+
+# Objects whose render failed recently: the thumbnail/preview routes are public, so
+# without this every request would download and render the whole PDF again
+_failed = TTLCache(
+    settings.NOTE_PREVIEW_FAILURE_MAX_ENTRIES, settings.NOTE_PREVIEW_FAILURE_TTL_SECONDS
+)
+
+
+def rendition_key(object_key: str, kind: str) -> str:
+    return f"{RENDITION_PREFIX}{object_key}/{kind}"
+
+
+def source_key(key: str) -> Optional[str]:
+    # renditions/<object_key>/<kind> -> <object_key>, None for anything else
+    if not key.startswith(RENDITION_PREFIX) or "/" not in key[len(RENDITION_PREFIX) :]:
+        return None
+    return key[len(RENDITION_PREFIX) :].rsplit("/", 1)[0]
+
+
+def render_thumbnail(doc: pymupdf.Document, width: int = THUMBNAIL_WIDTH) -> bytes:
+    page = doc[0]
+    zoom = width / page.rect.width
+    pix = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+    return pix.tobytes("png")
+
+
+def render_preview(
+    doc: pymupdf.Document,
+    pages: int = PREVIEW_PAGES,
+    watermark: str = PREVIEW_WATERMARK,
+) -> bytes:
+    preview = pymupdf.open()
+    preview.insert_pdf(doc, from_page=0, to_page=min(pages, doc.page_count) - 1)
+    for page in preview:
+        rect = page.rect
+        fontsize = rect.width / 12
+        text_width = pymupdf.get_text_length(watermark, fontsize=fontsize)
+        center = pymupdf.Point(rect.width / 2, rect.height / 2)
+        page.insert_text(
+            pymupdf.Point(center.x - text_width / 2, center.y),
+            watermark,
+            fontsize=fontsize,
+            color=(0.8, 0.1, 0.1),
+            fill_opacity=0.3,
+            morph=(center, pymupdf.Matrix(-45)),
+            overlay=True,
+        )
+    data = preview.tobytes(garbage=3, deflate=True)
+    preview.close()
+    return data
+
+
+def ensure_renditions(object_key: str, bucket_name: str) -> bool:
+    """
+    Make sure the thumbnail and preview for `object_key` exist in storage, rendering
+    them from the original if needed. Blocking (S3 + CPU), run it off the event loop.
+    Returns False without retrying while a recent render of the object failed.
+    """
+    if _failed.get((bucket_name, object_key)):
+        return False
+    if minio_client.head_from_minio(rendition_key(object_key, PREVIEW), bucket_name):
+        return True
+
+    with _render_locks_guard:
+        entry = _render_locks.setdefault(object_key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            # Someone else may have rendered it (or failed to) while we waited
+            if _failed.get((bucket_name, object_key)):
+                return False
+            preview_key = rendition_key(object_key, PREVIEW)
+            if minio_client.head_from_minio(preview_key, bucket_name):
+                return True
+            rendered = _render_and_store(object_key, bucket_name)
+            if not rendered:
+                _failed.set((bucket_name, object_key), True)
+            return rendered
+    finally:
+        with _render_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                _render_locks.pop(object_key, None)
+
+
+def _render_and_store(object_key: str, bucket_name: str) -> bool:
+    # PyMuPDF works from a local file, so the original never sits fully in memory
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        if not minio_client.download_to_path(object_key, bucket_name, path):
+            return False
+        try:
+            with pymupdf.open(path) as doc:
+                if doc.page_count == 0:
+                    return False
+                thumbnail = render_thumbnail(doc)
+                preview = render_preview(doc)
+        except Exception as e:
+            print(f"Failed to render previews for {object_key}: {e}")
+            return False
+
+        # Thumbnail first: the preview's presence marks the renditions as complete
+        return minio_client.upload_bytes_to_minio(
+            thumbnail,
+            rendition_key(object_key, THUMBNAIL),
+            bucket_name,
+            RENDITION_TYPES[THUMBNAIL],
+        ) and minio_client.upload_bytes_to_minio(
+            preview,
+            rendition_key(object_key, PREVIEW),
+            bucket_name,
+            RENDITION_TYPES[PREVIEW],
+        )
+    finally:
+        os.unlink(path)
+
+
+def delete_renditions(object_key: str, bucket_name: str) -> None:
+    keys = [rendition_key(object_key, kind) for kind in RENDITION_TYPES]
+    minio_client.delete_many_from_minio(keys, bucket_name)
@@ -1,14 +1,19 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import Session
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 from ..deps import (
     db_session,
     require_admin_db,
     create_course,
     get_all_courses,
+    search_courses,
+    search_notes,
+    Page,
+    page,
+    paginated,
     User,
     Course,
     Note,
@@ -48,12 +53,33 @@ def list_courses(session: Session = Depends(db_session)):
     return get_all_courses(session)
 
 
+@router.get("/search", response_model=List[Course])
+def search_courses_endpoint(
+    query: str = Query(..., min_length=1, description="Course code or title"),
+    limit: int = Query(10, ge=1, le=50),
+    session: Session = Depends(db_session),
+):
+    # Typo-tolerant course lookup, public endpoint
+    return search_courses(session, query=query, limit=limit)
+
+
 @router.get("/{course_id}/notes", response_model=List[Note])
 def get_course_notes(
     course_id: int,
+    response: Response,
+    sort: Optional[str] = Query(
+        None, pattern="^rating$", description="rating: best rated first"
+    ),
+    pagination: Page = Depends(page),
     session: Session = Depends(db_session),
 ):
-    # Get all notes for a specific course, public endpoint
-    from ..db import search_notes
-
-    return search_notes(session, course_id=course_id, limit=100)
+    # Get notes for a specific course, newest first (or best rated), public endpoint
+    return paginated(
+        response,
+        search_notes,
+        session=session,
+        course_id=course_id,
+        sort=sort,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+    )
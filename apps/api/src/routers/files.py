@@ -1,21 +1,29 @@
 from __future__ import annotations
 
+import base64
+import re
+
 from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
     Body,
+    Request,
 )
-from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select
 
 # Refactored files.py for pure file utility routes and generic file handling rather than note-specific logic
 # The note-specific logic now lives in routers/notes.py
 
 from ..deps import (
+    db_session,
     get_current_db_user,
+    get_current_db_user_async,
+    release_object,
     User,
-    get_file_from_minio,
-    delete_from_minio,
+    Note,
+    storage,
+    cache_stats,
     presign_put,
     presign_get,
 )
@@ -29,26 +37,38 @@ BUCKET_NAME = settings.MINIO_BUCKET
 async def download_file(
     bucket: str,
     object_key: str,
-    current_user: User = Depends(get_current_db_user),
+    request: Request,
+    current_user: User = Depends(get_current_db_user_async),
 ):
     """
-    Generic file download from MinIO
+    Generic file download from MinIO (streamed, supports Range requests)
     Use /notes/{note_id}/download for note downloads with ownership checks
     """
-    content = get_file_from_minio(object_key, bucket)
-    if content:
-        return StreamingResponse(
-            content,
-            media_type="application/octet-stream",
-            headers={"Content-Disposition": f'attachment; filename="{object_key}"'},
-        )
+    response = await storage.stream_from_minio(
+        object_key,
+        bucket,
+        range_header=request.headers.get("range"),
+        if_range=request.headers.get("if-range"),
+        headers={"Content-Disposition": f'attachment; filename="{object_key}"'},
+    )
+    if response:
+        return response
     raise HTTPException(status_code=404, detail="File not found")
 
 
+@router.get("/cache/stats")
+def get_cache_stats(current_user: User = Depends(get_current_db_user)):
+    # Hit/miss counters for the local hot-object cache (admin use)
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return cache_stats()
+
+
 @router.delete("/{bucket}/{object_key:path}")
-async def delete_file(
+def delete_file(
     bucket: str,
     object_key: str,
+    session: Session = Depends(db_session),
     current_user: User = Depends(get_current_db_user),
 ):
     """
@@ -59,8 +79,13 @@ async def delete_file(
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    res = delete_from_minio(object_key, bucket)
-    if res:
+    # Deduplicated objects are shared, only the last reference may delete them
+    in_use = session.exec(select(Note.id).where(Note.object_key == object_key)).first()
+    if in_use is not None:
+        raise HTTPException(
+            status_code=409, detail="File is used by a note, delete the note instead"
+        )
+    if release_object(session, object_key, bucket):
         return {"message": "File deleted", "object_key": object_key}
     raise HTTPException(status_code=404, detail="File not found")
 
@@ -69,17 +94,36 @@ async def delete_file(
 def sign_upload(
     filename: str = Body(..., embed=True),
     content_type: str = Body(..., embed=True),
+    sha256: str = Body(..., embed=True),
     bucket: str = Body("notes", embed=True),
     current_user: User = Depends(get_current_db_user),
 ):
     """
     Generate presigned URL for direct browser → MinIO upload
     Large files/chunks should use this method instead of uploading via API
+    `sha256` is the hex SHA-256 of the file: the PUT must send the returned headers,
+    and MinIO rejects a body with a different checksum
     """
+    if not re.fullmatch(r"[0-9a-fA-F]{64}", sha256):
+        raise HTTPException(status_code=400, detail="sha256 must be a hex SHA-256")
+    checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+
     # Namespace by user to avoid conflicts
     key = f"users/{current_user.id}/{filename}"
-    url = presign_put(key, content_type=content_type, expires=300)
-    return {"uploadUrl": url, "objectKey": key, "bucket": bucket, "expiresIn": 300}
+    url = presign_put(
+        key,
+        content_type=content_type,
+        expires=300,
+        bucket_name=bucket,
+        checksum_sha256=checksum,
+    )
+    return {
+        "uploadUrl": url,
+        "objectKey": key,
+        "bucket": bucket,
+        "expiresIn": 300,
+        "headers": {"Content-Type": content_type, "x-amz-checksum-sha256": checksum},
+    }
 
 
 @router.post("/presign-download")
@@ -1,5 +1,11 @@
 from fastapi import APIRouter
 
+from .. import counters, jobs, jwks, view_dedup
+from ..auth import token_cache_stats
+from ..db import async_engine, engine
+from ..metrics import startup
+from ..pool import pool_stats
+
 # not necessary for this simple router but all routers should import the following line
 # from ..deps import db_session, current_user, maybe_user, page
 
@@ -10,3 +16,29 @@ router = APIRouter()
 @router.get("/health")
 def health():
     return {"ok": True}
+
+
+# Cold-start timings for this worker (import, bucket verify, DB check, total)
+@router.get("/health/startup")
+def health_startup():
+    return {"startup": startup}
+
+
+# Connection pool usage for this worker: checked out, overflow, checkout wait times,
+# plus the buffered view/download counter flushes, view de-dup cache and job workers
+@router.get("/health/db")
+def health_db():
+    return {
+        "sync": pool_stats(engine),
+        "async": pool_stats(async_engine),
+        "counters": counters.stats,
+        "view_dedup": view_dedup.stats(),
+        "jobs": jobs.info(),
+    }
+
+
+# Verified-token cache for this worker (a hit skips RS256 verification) and the
+# background-refreshed JWKS
+@router.get("/health/auth")
+def health_auth():
+    return {"token_cache": token_cache_stats(), "jwks": jwks.info()}
@@ -1,41 +1,81 @@
 from __future__ import annotations
-from fastapi import APIRouter, HTTPException, Query, UploadFile, File, Form, Depends
-from fastapi.responses import Response
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    HTTPException,
+    Query,
+    UploadFile,
+    File,
+    Form,
+    Depends,
+    Request,
+    Response,
+)
+from fastapi.responses import RedirectResponse
+from pydantic import BaseModel, ConfigDict, Field
+from starlette.concurrency import run_in_threadpool
 from sqlmodel import Session, select, func
 from typing import Optional, List
-import uuid
+import base64
 import logging
-from datetime import datetime
 
-from ..transcribe import transcribe_pdf
+from ..models import Rating
+from ..settings import settings
+from .. import counters, jobs, view_dedup
 from ..deps import (
     db_session,
+    async_db_session,
+    AsyncSession,
+    get_note_with_course_async,
+    has_purchased_note_async,
     get_current_db_user,
+    get_current_db_user_async,
     User,
     Note,
     Course,
     Purchase,
     create_note,
+    Page,
+    page,
+    paginated,
     search_notes,
     get_user_purchased_notes,
     get_user_uploaded_notes,
     create_purchase,
     has_purchased_note,
-    upload_bytes_to_minio,
-    get_file_from_minio,
+    rate_note_async,
+    delete_rating_async,
+    get_note_ratings,
+    get_latest_job,
+    RATING_MIN,
+    RATING_MAX,
+    storage,
+    is_pdf_header,
+    UploadTooLargeError,
+    blob_key,
+    hash_fileobj,
+    acquire_blob,
+    release_object,
+    ensure_renditions,
+    rendition_key,
+    RENDITION_TYPES,
+    THUMBNAIL,
+    PREVIEW,
+    head_from_minio,
+    read_range_from_minio,
+    copy_within_minio,
     delete_from_minio,
+    presign_get,
+    content_disposition,
 )
 
 router = APIRouter(prefix="/notes", tags=["notes"])
 logger = logging.getLogger(__name__)
 
-# In-memory cache for view tracking
-_view_cache = {}
-VIEW_COOLDOWN_MINUTES = 5
-
 
 @router.post("/upload", response_model=Note)
 async def upload_note(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     title: str = Form(...),
     course_id: str = Form(...),
@@ -53,9 +93,17 @@ async def upload_note(
     autocorrect = autocorrect == "true"
     # Upload a new note (authenticated users only)
     try:
-        # Validate file type
-        if not file.content_type or not file.content_type.startswith("application/pdf"):
+        # Validate file type from the first bytes, not the client-supplied content_type
+        max_bytes = settings.NOTE_MAX_UPLOAD_BYTES
+        if file.size is not None and file.size > max_bytes:
+            raise HTTPException(
+                status_code=413, detail=f"File exceeds the {max_bytes} byte limit"
+            )
+        head = await file.read(1024)
+        await file.seek(0)
+        if not is_pdf_header(head):
             raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+        content_type = "application/pdf"
 
         # Validate and convert course_id
         try:
@@ -71,7 +119,8 @@ async def upload_note(
             raise HTTPException(status_code=400, detail="Invalid price format")
 
         # Verify course exists in database
-        course = session.get(Course, course_id_int)
+        # Sync session in an async route: DB calls go to the threadpool
+        course = await run_in_threadpool(session.get, Course, course_id_int)
         if not course:
             logger.error(f"Course {course_id_int} not found in database")
             raise HTTPException(
@@ -79,29 +128,44 @@ async def upload_note(
                 detail=f"Course with ID {course_id_int} does not exist. Please select a valid course.",
             )
 
-        # Generate unique object key
-        file_ext = file.filename.split(".")[-1] if "." in file.filename else "pdf"
-        object_key = f"{uuid.uuid4()}.{file_ext}"
-
-        # Upload to MinIO first
-        file_data = await file.read()
-        if transcribed:
-            file_data = transcribe_pdf(file_data, autocorrect)
-        success = upload_bytes_to_minio(
-            file_data, object_key, "notes", file.content_type
+        # Hash the content, identical files share one content-addressed object
+        try:
+            digest, size = await run_in_threadpool(hash_fileobj, file.file, max_bytes)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        object_key = blob_key(digest)
+
+        # Upload to MinIO first (duplicates of an object already stored skip the PUT)
+        needs_upload = await run_in_threadpool(
+            acquire_blob,
+            session,
+            sha256=digest,
+            object_key=object_key,
+            size=size,
+            bucket_name="notes",
         )
+        if not needs_upload:
+            success = True
+            logger.info(f"Deduplicated upload, reusing {object_key}")
+        else:
+            # Stream the spooled upload part by part, memory stays flat
+            success = await storage.upload_stream_to_minio(
+                file.file, object_key, "notes", content_type, max_bytes=max_bytes
+            )
 
         if not success:
             logger.error(f"Failed to upload {object_key} to MinIO")
+            await run_in_threadpool(release_object, session, object_key, "notes")
             raise HTTPException(
                 status_code=500, detail="Failed to upload file to storage"
             )
 
         logger.info(f"Successfully uploaded {object_key} to MinIO")
 
-        # Create note in database
+        # Create note in database, with its transcription job in the same transaction
         try:
-            note = create_note(
+            note = await run_in_threadpool(
+                create_note,
                 session,
                 author_id=current_user.id,
                 course_id=course_id_int,
@@ -110,23 +174,35 @@ async def upload_note(
                 semester=semester,
                 description=description,
                 object_key=object_key,
-                file_type=file.content_type,
+                file_type=content_type,
                 price=price_int,
                 is_free=is_free_bool,
+                job_kind=jobs.TRANSCRIBE if transcribed else None,
+                job_payload={"autocorrect": autocorrect, "object_key": object_key},
             )
-            logger.info(f"Successfully created note {note.id} in database")
-            return note
         except Exception as db_error:
             logger.error(
                 f"Database error creating note: {str(db_error)}", exc_info=True
             )
-            # Clean up MinIO upload if DB operation fails
-            delete_from_minio(object_key, "notes")
+            # Nothing was committed: drop our blob reference (and the object if
+            # nobody else uses it)
+            await run_in_threadpool(session.rollback)
+            await run_in_threadpool(release_object, session, object_key, "notes")
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to save note to database: {str(db_error)}",
             )
 
+        # The note owns the blob reference from here on, never release it below
+        logger.info(f"Successfully created note {note.id} in database")
+        if transcribed:
+            # The original is served until the job swaps in the transcribed copy,
+            # poll GET /notes/{id}/transcription
+            jobs.notify()
+        if settings.NOTE_PREVIEWS_ON_UPLOAD:
+            background_tasks.add_task(ensure_renditions, object_key, "notes")
+        return note
+
     except HTTPException:
         raise
     except ValueError as e:
@@ -137,42 +213,200 @@ async def upload_note(
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
+class NoteFinalize(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    object_key: str = Field(alias="objectKey")
+    # The bucket /files/presign-upload signed the PUT for
+    bucket: str = "notes"
+    title: str
+    course_id: int
+    course_name: str
+    semester: str
+    description: Optional[str] = None
+    price: int = 100
+    is_free: bool = False
+
+
+@router.post("/finalize", response_model=Note)
+def finalize_note(
+    payload: NoteFinalize,
+    background_tasks: BackgroundTasks,
+    session: Session = Depends(db_session),
+    current_user: User = Depends(get_current_db_user),
+):
+    """
+    Turn an object uploaded via /files/presign-upload into a Note
+    The browser uploads straight to MinIO with a signed SHA-256 checksum, so the
+    content address comes from HEAD and the file bytes never pass through the API.
+    The object is copied server side to its content-addressed key (deduplicated like
+    /notes/upload) and the per-user upload is dropped
+    """
+    upload_key, bucket = payload.object_key, payload.bucket
+
+    # Presigned uploads are namespaced per user, don't let anyone claim someone else's object
+    if not upload_key.startswith(f"users/{current_user.id}/") or ".." in upload_key:
+        raise HTTPException(status_code=403, detail="Object does not belong to you")
+
+    course = session.get(Course, payload.course_id)
+    if not course:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Course with ID {payload.course_id} does not exist. Please select a valid course.",
+        )
+
+    head = head_from_minio(upload_key, bucket, checksum=True)
+    if head is None:
+        raise HTTPException(status_code=404, detail="Uploaded object not found")
+    # The presigned PUT is still valid until it expires: pin every later read to
+    # the version checked here
+    etag = head.get("ETag")
+
+    max_bytes = settings.NOTE_MAX_UPLOAD_BYTES
+    if head["ContentLength"] > max_bytes:
+        delete_from_minio(upload_key, bucket)
+        raise HTTPException(
+            status_code=413, detail=f"File exceeds the {max_bytes} byte limit"
+        )
+
+    content_type = head.get("ContentType") or ""
+    if not content_type.startswith("application/pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+
+    if settings.NOTE_FINALIZE_SNIFF:
+        first_bytes = read_range_from_minio(upload_key, bucket, 0, 1023, if_match=etag)
+        if not first_bytes or not is_pdf_header(first_bytes):
+            raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+
+    # S3 verified the body against the checksum signed into the PUT, it is the
+    # content address. Multipart checksums ("...-N") aren't a hash of the file
+    checksum = head.get("ChecksumSHA256") or ""
+    try:
+        digest = base64.b64decode(checksum, validate=True).hex()
+    except ValueError:
+        digest = ""
+    if len(digest) != 64:
+        raise HTTPException(
+            status_code=400,
+            detail="Upload has no SHA-256 checksum, request a new upload URL",
+        )
+    object_key = blob_key(digest)
+
+    if acquire_blob(
+        session,
+        sha256=digest,
+        object_key=object_key,
+        size=head["ContentLength"],
+        bucket_name="notes",
+    ):
+        if not copy_within_minio(
+            upload_key, object_key, "notes", src_bucket=bucket, if_match=etag
+        ):
+            release_object(session, object_key, "notes")
+            current = head_from_minio(upload_key, bucket)
+            if current is None or current.get("ETag") != etag:
+                raise HTTPException(
+                    status_code=409, detail="Upload changed while finalizing"
+                )
+            raise HTTPException(
+                status_code=500, detail="Failed to upload file to storage"
+            )
+    else:
+        logger.info(f"Deduplicated presigned upload, reusing {object_key}")
+
+    try:
+        note = create_note(
+            session,
+            author_id=current_user.id,
+            course_id=payload.course_id,
+            title=payload.title,
+            course_name=payload.course_name,
+            semester=payload.semester,
+            description=payload.description,
+            object_key=object_key,
+            file_type="application/pdf",
+            price=payload.price,
+            is_free=payload.is_free,
+        )
+    except Exception as db_error:
+        logger.error(f"Database error creating note: {str(db_error)}", exc_info=True)
+        session.rollback()
+        release_object(session, object_key, "notes")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to save note to database: {str(db_error)}",
+        )
+
+    # The note owns a reference to the shared copy now, the upload itself can go
+    delete_from_minio(upload_key, bucket)
+    logger.info(f"Finalized presigned upload {upload_key} as note {note.id}")
+    if settings.NOTE_PREVIEWS_ON_UPLOAD:
+        background_tasks.add_task(ensure_renditions, object_key, "notes")
+    return note
+
+
 @router.get("/search", response_model=List[Note])
 def search_notes_endpoint(
+    response: Response,
     query: Optional[str] = Query(None, description="Search term"),
     course_id: Optional[int] = Query(None),
     semester: Optional[str] = Query(None),
-    limit: int = Query(20, ge=1, le=100),
-    offset: int = Query(0, ge=0),
+    fuzzy: bool = Query(False, description="Typo-tolerant title match"),
+    sort: Optional[str] = Query(
+        None, pattern="^rating$", description="rating: best rated first"
+    ),
+    pagination: Page = Depends(page),
     session: Session = Depends(db_session),
 ):
     # Search notes with filters, public endpoint
-    return search_notes(
-        session,
+    return paginated(
+        response,
+        search_notes,
+        session=session,
         query=query,
         course_id=course_id,
         semester=semester,
-        limit=limit,
-        offset=offset,
+        fuzzy=fuzzy,
+        sort=sort,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
     )
 
 
 @router.get("/library", response_model=List[Note])
 def get_library(
+    response: Response,
+    pagination: Page = Depends(page),
     session: Session = Depends(db_session),
     current_user: User = Depends(get_current_db_user),
 ):
     """Get user's purchased notes (Library tab)."""
-    return get_user_purchased_notes(session, user_id=current_user.id)
+    return paginated(
+        response,
+        get_user_purchased_notes,
+        session=session,
+        user_id=current_user.id,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+    )
 
 
 @router.get("/uploaded", response_model=List[Note])
 def get_uploaded(
+    response: Response,
+    pagination: Page = Depends(page),
     session: Session = Depends(db_session),
     current_user: User = Depends(get_current_db_user),
 ):
     """Get user's uploaded notes (Uploaded tab)."""
-    return get_user_uploaded_notes(session, user_id=current_user.id)
+    return paginated(
+        response,
+        get_user_uploaded_notes,
+        session=session,
+        user_id=current_user.id,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+    )
 
 
 @router.get("/debug/stats")
@@ -205,16 +439,15 @@ def get_note_stats(session: Session = Depends(db_session)):
 @router.get("/{note_id}")
 async def get_note(
     note_id: int,
-    session: Session = Depends(db_session),
-    current_user: User = Depends(get_current_db_user),
+    session: AsyncSession = Depends(async_db_session),
+    current_user: User = Depends(get_current_db_user_async),
 ):
     # Get a single note by ID, with no view increment (moved to separate endpoint)
-    note = session.get(Note, note_id)
+    note, course = await get_note_with_course_async(session, note_id)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
     # Return note
-    course = session.get(Course, note.course_id)
     note_dict = {
         "id": note.id,
         "title": note.title,
@@ -225,8 +458,10 @@ async def get_note(
         "price": note.price,
         "is_free": note.is_free,
         "author_id": note.author_id,
-        "downloads": note.downloads or 0,
-        "views": note.views or 0,
+        "downloads": (note.downloads or 0) + counters.pending(note.id, "downloads"),
+        "views": (note.views or 0) + counters.pending(note.id, "views"),
+        "rating_count": note.rating_count,
+        "rating_avg": note.rating_avg,
         "created_at": note.created_at.isoformat(),
         "object_key": note.object_key,
         "file_type": note.file_type,
@@ -237,31 +472,49 @@ async def get_note(
 @router.post("/{note_id}/view")
 async def increment_view(
     note_id: int,
-    session: Session = Depends(db_session),
-    current_user: User = Depends(get_current_db_user),
+    session: AsyncSession = Depends(async_db_session),
+    current_user: User = Depends(get_current_db_user_async),
 ):
     # Increment view count for a note (call once per page load)
-    note = session.get(Note, note_id)
+    note = await session.get(Note, note_id)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    # Don't count author's own views
-    if current_user.id != note.author_id:
-        cache_key = f"{current_user.id}:{note_id}"
-        last_view = _view_cache.get(cache_key)
+    # Don't count author's own views, or repeat views within the cooldown
+    if current_user.id != note.author_id and await view_dedup.should_count(
+        current_user.id, note_id
+    ):
+        counters.add(note_id, "views")
 
-        # Only increment if not viewed recently
-        if (
-            not last_view
-            or (datetime.utcnow() - last_view).total_seconds()
-            > VIEW_COOLDOWN_MINUTES * 60
-        ):
-            note.views = (note.views or 0) + 1
-            session.add(note)
-            session.commit()
-            _view_cache[cache_key] = datetime.utcnow()
+    return {"views": (note.views or 0) + counters.pending(note_id, "views")}
+
+
+@router.get("/{note_id}/transcription")
+def get_transcription_status(
+    note_id: int,
+    session: Session = Depends(db_session),
+    current_user: User = Depends(get_current_db_user),
+):
+    """Progress of the note's transcription job (author or admin)"""
+    note = session.get(Note, note_id)
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not found")
+    if note.author_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only the author can see this")
 
-    return {"views": note.views or 0}
+    job = get_latest_job(session, note_id=note_id, kind=jobs.TRANSCRIBE)
+    if not job:
+        raise HTTPException(status_code=404, detail="Note was not transcribed")
+    return {
+        "note_id": note_id,
+        "job_id": job.id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
 
 
 @router.post("/{note_id}/purchase", response_model=Purchase)
@@ -307,20 +560,178 @@ def check_ownership(
     }
 
 
-@router.get("/{note_id}/download")
-async def download_note(
+class RatingSubmit(BaseModel):
+    rating: float = Field(ge=RATING_MIN, le=RATING_MAX)
+    description: Optional[str] = None
+
+
+@router.put("/{note_id}/rating", response_model=Rating)
+async def rate_note_endpoint(
+    note_id: int,
+    payload: RatingSubmit,
+    session: AsyncSession = Depends(async_db_session),
+    current_user: User = Depends(get_current_db_user_async),
+):
+    """Rate a note (owners only), rating it again replaces the previous rating"""
+    note = await session.get(Note, note_id)
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not found")
+    if note.author_id == current_user.id:
+        raise HTTPException(
+            status_code=403, detail="Authors can't rate their own notes"
+        )
+    if not (
+        note.is_free
+        or await has_purchased_note_async(
+            session, user_id=current_user.id, note_id=note_id
+        )
+    ):
+        raise HTTPException(status_code=403, detail="Purchase the note to rate it")
+
+    try:
+        return await rate_note_async(
+            session,
+            user_id=current_user.id,
+            note_id=note_id,
+            rating=payload.rating,
+            description=payload.description,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/{note_id}/rating")
+async def delete_rating_endpoint(
+    note_id: int,
+    session: AsyncSession = Depends(async_db_session),
+    current_user: User = Depends(get_current_db_user_async),
+):
+    # Remove the current user's rating of a note
+    try:
+        await delete_rating_async(session, user_id=current_user.id, note_id=note_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": "Rating deleted", "note_id": note_id}
+
+
+@router.get("/{note_id}/ratings", response_model=List[Rating])
+def get_ratings(
+    note_id: int,
+    response: Response,
+    pagination: Page = Depends(page),
+    session: Session = Depends(db_session),
+):
+    # A note's ratings, newest first, public endpoint
+    return paginated(
+        response,
+        get_note_ratings,
+        session=session,
+        note_id=note_id,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+    )
+
+
+async def _serve_rendition(
+    note_id: int, kind: str, request: Request, session: AsyncSession
+):
+    note = await session.get(Note, note_id)
+    if not note or not note.object_key:
+        raise HTTPException(status_code=404, detail="Note not found")
+
+    key = rendition_key(note.object_key, kind)
+    stream_kwargs = dict(
+        if_none_match=request.headers.get("if-none-match"),
+        range_header=request.headers.get("range"),
+        if_range=request.headers.get("if-range"),
+        media_type=RENDITION_TYPES[kind],
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
+    response = await storage.stream_from_minio(key, "notes", **stream_kwargs)
+    if response is None:
+        # Not rendered yet (older note, or still rendering after upload)
+        rendered = await run_in_threadpool(ensure_renditions, note.object_key, "notes")
+        if rendered:
+            response = await storage.stream_from_minio(key, "notes", **stream_kwargs)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Preview not available")
+    return response
+
+
+@router.get("/{note_id}/thumbnail")
+async def get_thumbnail(
+    note_id: int,
+    request: Request,
+    session: AsyncSession = Depends(async_db_session),
+):
+    # Low-res first page image, public so course pages can use it in <img> tags
+    return await _serve_rendition(note_id, THUMBNAIL, request, session)
+
+
+@router.get("/{note_id}/preview")
+async def get_preview(
+    note_id: int,
+    request: Request,
+    session: AsyncSession = Depends(async_db_session),
+):
+    # Watermarked first pages as a PDF, public so anyone can peek before buying
+    return await _serve_rendition(note_id, PREVIEW, request, session)
+
+
+@router.delete("/{note_id}")
+def delete_note(
     note_id: int,
     session: Session = Depends(db_session),
     current_user: User = Depends(get_current_db_user),
 ):
-    """Download a note file (requires ownership)"""
+    """Delete a note (author or admin), the file goes once no other note shares it"""
     note = session.get(Note, note_id)
+    if not note:
+        raise HTTPException(status_code=404, detail="Note not found")
+    if note.author_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Only the author can delete a note")
+
+    purchased = session.exec(
+        select(Purchase).where(Purchase.note_id == note_id)
+    ).first()
+    if purchased:
+        raise HTTPException(status_code=409, detail="Purchased notes can't be deleted")
+
+    object_key = note.object_key
+    for rating in session.exec(select(Rating).where(Rating.note_id == note_id)):
+        session.delete(rating)
+    session.delete(note)
+    session.commit()
+
+    if object_key:
+        release_object(session, object_key, "notes")
+    return {"message": "Note deleted", "note_id": note_id}
+
+
+@router.get("/{note_id}/download")
+async def download_note(
+    note_id: int,
+    request: Request,
+    mode: Optional[str] = Query(
+        None,
+        pattern="^(stream|redirect|url)$",
+        description="Override NOTE_DOWNLOAD_MODE for this request",
+    ),
+    session: AsyncSession = Depends(async_db_session),
+    current_user: User = Depends(get_current_db_user_async),
+):
+    """
+    Download a note file (requires ownership)
+    Streams through the API with Range support, or hands out a short-lived presigned
+    GET (302 redirect or JSON {url}) depending on NOTE_DOWNLOAD_MODE
+    """
+    note = await session.get(Note, note_id)
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
     # Check ownership
     is_owner = note.author_id == current_user.id
-    has_purchased_note_flag = has_purchased_note(
+    has_purchased_note_flag = await has_purchased_note_async(
         session, user_id=current_user.id, note_id=note_id
     )
 
@@ -332,32 +743,46 @@ async def download_note(
     if not note.object_key:
         raise HTTPException(status_code=404, detail="File not found")
 
-    # Get file from MinIO
-    try:
-        file_data = get_file_from_minio(note.object_key, "notes")
-
-        if not file_data:
-            raise HTTPException(
-                status_code=500, detail="Failed to retrieve file from storage"
-            )
-
-        # Increment download count
-        note.downloads = (note.downloads or 0) + 1
-        session.add(note)
-        session.commit()
-
-        # Read the entire stream into memory
-        content = file_data.read()
+    filename = f"{note.title}.pdf"
+    mode = mode or settings.NOTE_DOWNLOAD_MODE
+    if mode in ("redirect", "url"):
+        # Let MinIO serve the bytes so API workers aren't the bandwidth bottleneck
+        expires = settings.NOTE_DOWNLOAD_URL_EXPIRES
+        url = presign_get(
+            note.object_key,
+            expires=expires,
+            bucket_name="notes",
+            filename=filename,
+            content_type="application/pdf",
+        )
+        counters.add(note_id, "downloads")
+        if mode == "redirect":
+            return RedirectResponse(url, status_code=302)
+        return {"url": url, "expiresIn": expires}
 
-        return Response(
-            content=content,
+    # Stream file from MinIO (never buffers the whole object)
+    try:
+        response = await storage.stream_from_minio(
+            note.object_key,
+            "notes",
+            range_header=request.headers.get("range"),
+            if_range=request.headers.get("if-range"),
             media_type="application/pdf",
-            headers={
-                "Content-Disposition": f'attachment; filename="{note.title}.pdf"',
-                "Content-Length": str(len(content)),
-            },
+            headers={"Content-Disposition": content_disposition(filename)},
         )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to download file: {str(e)}"
         )
+
+    if response is None:
+        raise HTTPException(
+            status_code=500, detail="Failed to retrieve file from storage"
+        )
+
+    # PDF viewers fetch page by page with Range requests, only count the first chunk
+    content_range = response.headers.get("content-range", "")
+    if response.status_code == 200 or content_range.startswith("bytes 0-"):
+        counters.add(note_id, "downloads")
+
+    return response
@@ -12,6 +12,13 @@ class Settings(BaseSettings):
 
     # DB: default to the working local credentials
     DATABASE_URL: str | None = None
+    # Connection pool, per engine per worker (see pool.py for sizing)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 keeps connections forever
+    # Behind PgBouncer in transaction pooling mode: no server-side prepared statements
+    DB_PGBOUNCER: bool = False
 
     # CORS: allow Next.js dev origins by default; can override later in .env as JSON or CSV
     CORS_ORIGINS: list[str] | None = None
@@ -22,11 +29,88 @@ class Settings(BaseSettings):
     MINIO_SECRET_KEY: str | None = None
     MINIO_BUCKET: str | None = None
     MINIO_FORCE_PATH_STYLE: bool = False
+    # Max concurrent S3 connections per worker (also sizes the async storage thread pool)
+    MINIO_MAX_POOL_CONNECTIONS: int = 10
+    # Bucket verification at startup gives up after this many seconds (MinIO slow/down)
+    MINIO_STARTUP_TIMEOUT: float = 5.0
+
+    # Note downloads: "stream" proxies bytes through the API, "redirect" answers with a
+    # 302 to a presigned GET, "url" returns the presigned URL as JSON
+    NOTE_DOWNLOAD_MODE: str = "stream"
+    NOTE_DOWNLOAD_URL_EXPIRES: int = 60  # seconds
+
+    # Local hot-object cache in front of MinIO (disabled unless OBJECT_CACHE_DIR is set)
+    OBJECT_CACHE_DIR: str | None = None
+    OBJECT_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+    OBJECT_CACHE_MAX_OBJECT_BYTES: int = 200 * 1024 * 1024
+    OBJECT_CACHE_MEMORY_BYTES: int = 0  # optional in-memory tier on top of the disk
+    OBJECT_CACHE_REVALIDATE_SECONDS: int = 30
+    # API worker processes per host (uvicorn --workers defaults to the same variable),
+    # they split OBJECT_CACHE_MAX_BYTES between them
+    WEB_CONCURRENCY: int = 1
+
+    # Note uploads are streamed to S3 in multipart chunks (S3 minimum part size is 5 MB)
+    NOTE_MAX_UPLOAD_BYTES: int = 100 * 1024 * 1024
+    MINIO_MULTIPART_PART_SIZE: int = 8 * 1024 * 1024
+    # Render thumbnail/preview renditions right after upload (otherwise on first request)
+    NOTE_PREVIEWS_ON_UPLOAD: bool = True
+    # A failed render (corrupt or empty PDF) isn't retried for this long
+    NOTE_PREVIEW_FAILURE_TTL_SECONDS: int = 600
+    NOTE_PREVIEW_FAILURE_MAX_ENTRIES: int = 10_000
+    # Sniff the first bytes of presigned uploads with a ranged GET before finalizing
+    NOTE_FINALIZE_SNIFF: bool = True
+
+    # Background jobs (transcription): worker tasks per process, 0 leaves jobs queued
+    # for other processes. Workers heartbeat their running jobs, one without a
+    # heartbeat for JOB_STALE_SECONDS lost its worker and is requeued. Retries back off
+    # exponentially from JOB_RETRY_BACKOFF_SECONDS, shutdown waits up to
+    # JOB_SHUTDOWN_SECONDS for running handlers
+    JOB_WORKERS: int = 1
+    JOB_POLL_SECONDS: float = 2.0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_HEARTBEAT_SECONDS: float = 15.0
+    JOB_STALE_SECONDS: int = 120
+    JOB_RETRY_BACKOFF_SECONDS: float = 30.0
+    JOB_SHUTDOWN_SECONDS: float = 30.0
+
+    # Transcription OCR: "documentai" (Google Document AI) or "local" (PyMuPDF text
+    # layer, an offline stand-in for tests and benchmarks)
+    OCR_BACKEND: str = "documentai"
+    DOCUMENT_AI_PROJECT_ID: str = "document-ai-479801"
+    DOCUMENT_AI_LOCATION: str = "us"
+    DOCUMENT_AI_PROCESSOR_ID: str = "f70206c200d81703"
+    # Service account key file, unset uses application default credentials
+    DOCUMENT_AI_CREDENTIALS_FILE: str | None = "document-ai-479801-eeca2f70d17b.json"
+
+    # Note view/download counters are buffered per worker and written in batches
+    NOTE_COUNTER_FLUSH_SECONDS: float = 5.0
+    # A user's repeat views of a note within the cooldown don't count. "memory" de-dups
+    # per worker (bounded), "postgres" shares it across workers via an unlogged table
+    VIEW_COOLDOWN_SECONDS: int = 300
+    VIEW_DEDUP_BACKEND: str = "memory"
+    VIEW_DEDUP_MAX_ENTRIES: int = 100_000
+
+    # Fuzzy (pg_trgm) search thresholds, 0..1, higher is stricter
+    NOTE_FUZZY_THRESHOLD: float = 0.4  # word similarity against Note.title
+    COURSE_FUZZY_THRESHOLD: float = 0.3  # similarity against Course.code/title
 
     # Auth-related
     AUTH_ISSUER: str | None = None  # ex: https://<subdomain>.clerk.accounts.dev
     AUTH_AUDIENCE: str | None = None  # ex: fastapi
     AUTH_JWKS_URL: str | None = None  # optional explicit JWKS URL
+    # Local JWKS file used instead of fetching (load tests, offline CI)
+    AUTH_JWKS_FILE: str | None = None
+    # JWKS is prefetched at startup and refreshed in the background
+    AUTH_JWKS_REFRESH_SECONDS: float = 600.0
+    AUTH_JWKS_MIN_REFRESH_SECONDS: float = 30.0  # on-demand refetch for unknown kids
+    AUTH_JWKS_TIMEOUT: float = 5.0
+    # Verified tokens cached per worker until exp minus the skew margin (0 disables)
+    AUTH_TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_TOKEN_CACHE_SKEW_SECONDS: float = 5.0
+    # Users whose row matches their token claims, cached per worker by token sub (0
+    # disables): skips the claim sync, the row itself is still read per request
+    USER_CACHE_TTL_SECONDS: float = 30.0
+    USER_CACHE_MAX_ENTRIES: int = 10000
 
     @field_validator("CORS_ORIGINS", mode="before")
     @classmethod
@@ -0,0 +1,96 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi.responses import Response
+
+from . import minio_client, object_cache
+from .settings import settings
+
+# Async versions of the minio_client helpers for use inside `async def` routes.
+# boto3 is blocking, so every call runs on a dedicated thread pool sized to the S3
+# connection pool. The semaphore provides backpressure: once all connections are busy,
+# callers wait here (as cheap suspended coroutines) instead of piling up in the
+# executor queue or blocking the event loop.
+
+_POOL_SIZE = settings.MINIO_MAX_POOL_CONNECTIONS
+_executor = ThreadPoolExecutor(max_workers=_POOL_SIZE, thread_name_prefix="storage")
+_slots = asyncio.Semaphore(_POOL_SIZE)
+
+
+async def run_storage(fn, *args, **kwargs):
+    # Run a blocking storage call on the storage pool without blocking the event loop
+    async with _slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _executor, functools.partial(fn, *args, **kwargs)
+        )
+
+
+async def get_file_from_minio(filename: str, bucket_name: str):
+    return await run_storage(minio_client.get_file_from_minio, filename, bucket_name)
+
+
+async def upload_bytes_to_minio(
+    data: bytes, filename: str, bucket_name: str, content_type: str = "application/pdf"
+) -> bool:
+    return await run_storage(
+        minio_client.upload_bytes_to_minio, data, filename, bucket_name, content_type
+    )
+
+
+async def upload_stream_to_minio(
+    fileobj,
+    filename: str,
+    bucket_name: str,
+    content_type: str = "application/pdf",
+    *,
+    max_bytes: Optional[int] = None,
+) -> Optional[int]:
+    return await run_storage(
+        minio_client.upload_stream_to_minio,
+        fileobj,
+        filename,
+        bucket_name,
+        content_type,
+        max_bytes=max_bytes,
+    )
+
+
+async def delete_from_minio(filename: str, bucket_name: str) -> bool:
+    object_cache.invalidate(filename, bucket_name)
+    return await run_storage(minio_client.delete_from_minio, filename, bucket_name)
+
+
+async def head_from_minio(filename: str, bucket_name: str) -> Optional[dict]:
+    return await run_storage(minio_client.head_from_minio, filename, bucket_name)
+
+
+async def stream_from_minio(
+    filename: str, bucket_name: str, **kwargs
+) -> Optional[Response]:
+    # Only the HEAD/GET setup runs here, Starlette iterates the body in its own threadpool.
+    # Hot objects are served from the local object cache when it's enabled
+    return await run_storage(
+        object_cache.stream_from_cache, filename, bucket_name, **kwargs
+    )
+
+
+async def verify_buckets(*bucket_names: str, timeout: float) -> bool:
+    # One startup round-trip per bucket (creating it if missing), bounded by `timeout`
+    async def _verify():
+        for name in dict.fromkeys(b for b in bucket_names if b):
+            await run_storage(minio_client.create_bucket, name)
+
+    try:
+        await asyncio.wait_for(_verify(), timeout=timeout)
+        return True
+    except Exception as e:
+        print(f"Warning: Could not create/verify buckets {bucket_names}: {e!r}")
+        return False
+
+
+def shutdown() -> None:
+    object_cache.shutdown()
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -12,78 +12,59 @@ import cv2
 from fastapi import UploadFile
 """
 
-from google.cloud import documentai_v1
-from google.api_core.client_options import ClientOptions
-from google.oauth2 import service_account
-from pdf_annotate import PdfAnnotator, Location, Appearance
-import fitz
-
-
-def transcribe_pdf(raw_bytes, autocorrect):
-    # Source for accessing the API: https://docs.cloud.google.com/document-ai/docs/send-request#documentai_process_document-python
-    # TODO: Move these all to .env
-    project_id = "document-ai-479801"
-    processor_id = "f70206c200d81703"
-    location = "us"
-
-    opts = ClientOptions(api_endpoint=f"{location}-documentai.googleapis.com")
-    credentials = service_account.Credentials.from_service_account_file(
-        "document-ai-479801-eeca2f70d17b.json"
-    )
+import os
+import tempfile
+from typing import Optional
 
-    client = documentai_v1.DocumentProcessorServiceClient(
-        client_options=opts, credentials=credentials
-    )
-
-    full_processor_name = client.processor_path(project_id, location, processor_id)
+from pdf_annotate import PdfAnnotator, Location, Appearance
 
-    request = documentai_v1.GetProcessorRequest(name=full_processor_name)
-    processor = client.get_processor(request=request)
+from .ocr import OcrBackend, get_backend
 
-    raw_document = documentai_v1.RawDocument(
-        content=raw_bytes,
-        mime_type="application/pdf",
-    )
 
-    request = documentai_v1.ProcessRequest(
-        name=processor.name, raw_document=raw_document
-    )
-    result = client.process_document(request=request)
-    document = result.document
+def _latin1(text: str) -> str:
+    # pdf_annotate's built-in fonts only cover Latin-1
+    return "".join(c if ord(c) < 256 else " " for c in text)
 
-    for c in range(len(document.text)):
-        if ord(document.text[c]) > 256:
-            document.text = document.text[:c] + " " + document.text[c+1:]
 
+def transcribe_pdf(raw_bytes, autocorrect, backend: Optional[OcrBackend] = None):
+    """
+    OCR the PDF with the configured backend (see ocr.py) and return a copy with the
+    recognized text overlaid as annotations, paragraph by paragraph.
+    """
+    pages = (backend or get_backend()).recognize(raw_bytes)
 
-    with open("BUFFER.pdf", "wb") as pdf_file:
-        pdf_file.write(raw_bytes)
+    # Per-call scratch file: jobs for different notes run concurrently
+    fd, buffer_path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as pdf_file:
+            pdf_file.write(raw_bytes)
 
-    new_doc = PdfAnnotator("BUFFER.pdf")
-    for i, page in enumerate(document.pages):
-        pc1 = page.layout.bounding_poly.vertices[0]
-        pc2 = page.layout.bounding_poly.vertices[2]
-        height = abs(pc1.y-pc2.y)
-        new_doc.set_page_dimensions((abs(pc1.x-pc2.x), abs(pc1.y-pc2.y)), i)
-        for paragraph in page.paragraphs:
-            c1 = paragraph.layout.bounding_poly.vertices[0]
-            c2 = paragraph.layout.bounding_poly.vertices[2]
-            new_doc.add_annotation(
-                'square',
-                Location(x1=c1.x, y1=height-c1.y, x2=c2.x, y2=height-c2.y, page=i),
-                Appearance(fill=(1, 1, 1), stroke_width=0),
-            )
-            text_anchor = paragraph.layout.text_anchor
-            start_index = int(text_anchor.text_segments[0].start_index)
-            end_index = int(text_anchor.text_segments[0].end_index)
-            text = document.text[start_index:end_index].strip()
-            new_doc.add_annotation(
-                'text',
-                Location(x1=c1.x, y1=height-c1.y, x2=c2.x, y2=height-c2.y, page=i),
-                Appearance(content=text, fill=(0, 0, 0), font_size=abs(c1.y-c2.y)/2),
-            )
-    new_doc.write("BUFFER.pdf")
-    with open("BUFFER.pdf", "rb") as f:
-        return f.read()
+        new_doc = PdfAnnotator(buffer_path)
+        for i, page in enumerate(pages):
+            height = page.height
+            new_doc.set_page_dimensions((page.width, height), i)
+            for p in page.paragraphs:
+                new_doc.add_annotation(
+                    "square",
+                    Location(
+                        x1=p.x1, y1=height - p.y1, x2=p.x2, y2=height - p.y2, page=i
+                    ),
+                    Appearance(fill=(1, 1, 1), stroke_width=0),
+                )
+                new_doc.add_annotation(
+                    "text",
+                    Location(
+                        x1=p.x1, y1=height - p.y1, x2=p.x2, y2=height - p.y2, page=i
+                    ),
+                    Appearance(
+                        content=_latin1(p.text),
+                        fill=(0, 0, 0),
+                        font_size=abs(p.y1 - p.y2) / 2,
+                    ),
+                )
+        new_doc.write(buffer_path)
+        with open(buffer_path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(buffer_path)
     # TODO: Save the text and somehow give users access to it.
-
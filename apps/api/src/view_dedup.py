@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .db import async_engine, mark_note_viewed_async, prune_note_views_async
+from .settings import settings
+from .ttl_cache import TTLCache
+
+# View de-duplication: a user's views of a note count at most once per
+# VIEW_COOLDOWN_SECONDS. Every worker keeps a bounded TTL cache of recent views; with
+# VIEW_DEDUP_BACKEND="postgres" the decision is made in a shared unlogged table so the
+# cooldown holds across workers, and the local cache only skips repeat round-trips.
+
+logger = logging.getLogger(__name__)
+
+_recent = TTLCache(settings.VIEW_DEDUP_MAX_ENTRIES, settings.VIEW_COOLDOWN_SECONDS)
+_prune_task: Optional[asyncio.Task] = None
+
+
+def _shared() -> bool:
+    return settings.VIEW_DEDUP_BACKEND == "postgres"
+
+
+async def should_count(user_id: int, note_id: int) -> bool:
+    """
+    True if this view counts (and marks it as seen), False if the same user already
+    viewed the note within the cooldown
+    """
+    if not _recent.add((user_id, note_id)):
+        return False
+    if not _shared():
+        return True
+
+    cooldown = timedelta(seconds=settings.VIEW_COOLDOWN_SECONDS)
+    try:
+        async with AsyncSession(async_engine) as session:
+            return await mark_note_viewed_async(
+                session, user_id=user_id, note_id=note_id, cooldown=cooldown
+            )
+    except Exception as e:
+        # Worst case a view counts twice, don't fail the request over it
+        logger.error(f"View de-dup lookup failed: {e}")
+        return True
+
+
+async def _prune_periodically() -> None:
+    cooldown = timedelta(seconds=settings.VIEW_COOLDOWN_SECONDS)
+    while True:
+        await asyncio.sleep(settings.VIEW_COOLDOWN_SECONDS)
+        try:
+            async with AsyncSession(async_engine) as session:
+                await prune_note_views_async(session, cooldown=cooldown)
+        except Exception as e:
+            logger.error(f"Failed to prune note views: {e}")
+
+
+def start() -> None:
+    # Only the shared backend has anything to clean up
+    global _prune_task
+    if _shared() and _prune_task is None:
+        _prune_task = asyncio.create_task(_prune_periodically())
+
+
+async def stop() -> None:
+    global _prune_task
+    if _prune_task is not None:
+        _prune_task.cancel()
+        try:
+            await _prune_task
+        except asyncio.CancelledError:
+            pass
+        _prune_task = None
+
+
+def stats() -> dict:
+    return {"backend": settings.VIEW_DEDUP_BACKEND, **_recent.stats()}
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import pytest
+
+# Unit tests run offline: importing src only builds the DB engines and S3 client,
+# nothing connects
+os.environ.setdefault("DATABASE_URL", "postgresql+psycopg://localhost/swampnotes")
+os.environ.setdefault("MINIO_ENDPOINT", "http://localhost:9000")
+os.environ.setdefault("MINIO_ACCESS_KEY", "test")
+os.environ.setdefault("MINIO_SECRET_KEY", "test")
+os.environ.setdefault("CORS_ORIGINS", "http://localhost:3000")
+
+# Tests marked with the `session` fixture need a throwaway Postgres database, its
+# schema is dropped and recreated: TEST_DATABASE_URL=postgresql+psycopg://.../test
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+# Make `src` importable however pytest is invoked (run from apps/api)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _create_schema(conn) -> None:
+    from sqlalchemy import text
+    from sqlalchemy.schema import CreateIndex, CreateTable
+    from sqlmodel import SQLModel
+
+    from src import models  # noqa: F401  registers the tables
+
+    conn.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public"))
+    # The fuzzy search indexes need pg_trgm, nothing under test uses them
+    trgm = conn.execute(
+        text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).first()
+    if trgm:
+        conn.execute(text("CREATE EXTENSION pg_trgm"))
+    for table in SQLModel.metadata.sorted_tables:
+        conn.execute(CreateTable(table))
+        for index in table.indexes:
+            ops = index.dialect_options["postgresql"]["ops"] or {}
+            if trgm or "gin_trgm_ops" not in ops.values():
+                conn.execute(CreateIndex(index))
+
+
+@pytest.fixture(scope="session")
+def engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from src.db import engine
+
+    with engine.begin() as conn:
+        _create_schema(conn)
+    return engine
+
+
+@pytest.fixture
+def session(engine):
+    from sqlalchemy import text
+    from sqlmodel import Session, SQLModel
+
+    tables = ", ".join(f'"{t.name}"' for t in SQLModel.metadata.sorted_tables)
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def users(session):
+    # Two users with points and a course to put notes in
+    from src.models import Course, User
+
+    rows = [
+        User(email="buyer@example.com", sub="buyer", points=1000),
+        User(email="author@example.com", sub="author", points=1000),
+        Course(code="COP3502", title="Programming 1", school="UF"),
+    ]
+    session.add_all(rows)
+    session.commit()
+    for row in rows:
+        session.refresh(row)
+    return rows[0], rows[1]
@@ -0,0 +1,96 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlmodel import Session
+
+from src import blobs
+from src.blobs import acquire_blob, blob_key, release_object
+from src.models import Blob
+
+DIGEST = "f" * 64
+KEY = blob_key(DIGEST)
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    # Keys present in the bucket; deletes remove them
+    keys = set()
+    monkeypatch.setattr(
+        blobs.minio_client,
+        "head_from_minio",
+        lambda key, bucket: {"ContentLength": 1} if key in keys else None,
+    )
+
+    def delete(key, bucket):
+        present = key in keys
+        keys.discard(key)
+        return present
+
+    monkeypatch.setattr(blobs, "_delete_object", delete)
+    return keys
+
+
+def _acquire(session):
+    return acquire_blob(
+        session, sha256=DIGEST, object_key=KEY, size=1, bucket_name="notes"
+    )
+
+
+def _ref_count(session):
+    session.expire_all()
+    blob = session.get(Blob, DIGEST)
+    return blob and blob.ref_count
+
+
+def test_first_reference_uploads_duplicates_skip(session, stored):
+    assert _acquire(session)
+    stored.add(KEY)
+    assert not _acquire(session)
+    assert _ref_count(session) == 2
+
+
+def test_duplicate_uploads_again_while_the_object_is_missing(session, stored):
+    # The first upload's row is committed but its PUT hasn't landed (or failed)
+    assert _acquire(session)
+    assert _acquire(session)
+    assert _ref_count(session) == 2
+
+
+def test_last_release_deletes_the_object(session, stored):
+    _acquire(session)
+    _acquire(session)
+    stored.add(KEY)
+
+    assert not release_object(session, KEY, "notes")
+    assert _ref_count(session) == 1
+    assert KEY in stored
+    assert release_object(session, KEY, "notes")
+    assert _ref_count(session) is None
+    assert KEY not in stored
+
+
+def test_legacy_keys_are_deleted_outright(session, stored):
+    stored.add("users/1/legacy.pdf")
+    assert release_object(session, "users/1/legacy.pdf", "notes")
+    assert not stored
+
+
+def test_concurrent_acquire_and_release_keep_count(session, stored, engine):
+    # Ten notes already share the blob; ten more are uploaded while five are deleted
+    for _ in range(10):
+        _acquire(session)
+    stored.add(KEY)
+
+    def run(op):
+        with Session(engine) as other:
+            if op == "acquire":
+                _acquire(other)
+            else:
+                release_object(other, KEY, "notes")
+
+    ops = ["acquire"] * 10 + ["release"] * 5
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(run, ops))
+
+    assert _ref_count(session) == 15
+    assert KEY in stored
@@ -0,0 +1,87 @@
+import re
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from sqlmodel import select
+
+from src.db import decode_cursor, encode_cursor, keyset_page, note_search_query
+from src.models import NOTE_SEARCH_CONFIG, Note
+
+
+def test_cursor_round_trip():
+    created = datetime(2024, 5, 6, 7, 8, 9, tzinfo=timezone.utc)
+    cursor = encode_cursor(created, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, 2) == [created.isoformat(), 42]
+
+
+@pytest.mark.parametrize("values", [(0.5, 7), ("title", None), (1,)])
+def test_cursor_round_trip_plain_values(values):
+    assert decode_cursor(encode_cursor(*values), len(values)) == list(values)
+
+
+@pytest.mark.parametrize(
+    "cursor", ["not base64!", encode_cursor(1, 2), "eyJhIjogMX0", ""]
+)
+def test_decode_cursor_invalid(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 3)
+
+
+RATING_KEYS = [Note.rating_avg, Note.rating_count, Note.created_at, Note.id]
+CREATED = "2024-05-06T07:08:09+00:00"
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        ("4.5", 3, CREATED, 1),  # number as a string
+        (4.5, 3, CREATED, "1"),
+        (4.5, 3.5, CREATED, 1),  # float for an integer column
+        (4.5, True, CREATED, 1),
+        (4.5, 3, 1714979289, 1),  # timestamp instead of ISO datetime
+        (4.5, 3, "yesterday", 1),
+        (4.5, 3, CREATED, None),
+        (4.5, 3, CREATED, [1]),
+    ],
+)
+def test_keyset_page_rejects_mistyped_cursor(values):
+    # Rejected before any query runs, so the route answers 400 rather than 500
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        keyset_page(
+            None, select(Note), RATING_KEYS, limit=5, cursor=encode_cursor(*values)
+        )
+
+
+def _sql(query: str) -> str:
+    # The tsquery expression with the search terms inlined, minus the text config
+    compiled = note_search_query(query).compile(dialect=postgresql.dialect())
+    sql = re.sub(
+        r"%\((\w+)\)s::\w+", lambda m: f"'{compiled.params[m[1]]}'", str(compiled)
+    )
+    return sql.replace(f"'{NOTE_SEARCH_CONFIG}', ", "")
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("calculus", "websearch_to_tsquery('calculus')"),
+        ("calc*", "to_tsquery('calc:*')"),
+        ("-calc*", "tsquery_not(to_tsquery('calc:*'))"),
+        (
+            "x or calc*",
+            "websearch_to_tsquery('x') || to_tsquery('calc:*')",
+        ),
+        (
+            '"linear algebra" -proof',
+            "websearch_to_tsquery('\"linear algebra\"') && "
+            "tsquery_not(websearch_to_tsquery('proof'))",
+        ),
+        ("or", "websearch_to_tsquery('or')"),
+        ("", "websearch_to_tsquery('')"),
+    ],
+)
+def test_note_search_query(query, expected):
+    assert _sql(query) == expected
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import Session, select
+
+from src import jobs
+from src.db import claim_job, finish_job, heartbeat_jobs, requeue_jobs
+from src.models import Job
+from src.settings import settings
+
+NOW = datetime.now(timezone.utc)
+STALE = NOW - timedelta(minutes=10)
+
+
+def _job(session, **values) -> int:
+    values.setdefault("kind", "transcribe")
+    job = Job(**values)
+    session.add(job)
+    session.commit()
+    return job.id
+
+
+def _get(session, job_id) -> Job:
+    session.expire_all()
+    return session.get(Job, job_id)
+
+
+def test_claim_oldest_ready_job(session):
+    _job(session, run_after=NOW + timedelta(minutes=5))  # backing off
+    first = _job(session)
+    _job(session, kind="other")
+    second = _job(session)
+
+    job = claim_job(session, kinds=["transcribe"])
+    assert job.id == first
+    assert (job.status, job.attempts) == ("running", 1)
+    assert job.heartbeat_at is not None
+    assert claim_job(session, kinds=["transcribe"]).id == second
+    assert claim_job(session, kinds=["transcribe"]) is None
+
+
+def test_claim_skips_locked_jobs(session, engine):
+    first, second = _job(session), _job(session)
+    with Session(engine) as other:
+        # Another worker is mid-claim on the oldest job and holds its row lock
+        other.exec(select(Job).where(Job.id == first).with_for_update()).one()
+        assert claim_job(session, kinds=["transcribe"]).id == second
+    assert claim_job(session, kinds=["transcribe"]).id == first
+
+
+def test_finish_job(session):
+    job_id = _job(session)
+    claim_job(session, kinds=["transcribe"])
+    retry_at = NOW + timedelta(minutes=1)
+    assert finish_job(session, job_id=job_id, error="boom", retry_at=retry_at)
+    job = _get(session, job_id)
+    assert (job.status, job.error) == ("queued", "boom")
+    assert job.run_after is not None
+    # Not running anymore: a late result from a worker that lost the job is dropped
+    assert not finish_job(session, job_id=job_id)
+
+
+def test_stale_jobs_are_requeued(session):
+    alive = _job(session, status="running", attempts=1, heartbeat_at=NOW)
+    stale = _job(session, status="running", attempts=1, heartbeat_at=STALE)
+
+    heartbeat_jobs(session, job_ids=[alive])
+    cutoff = NOW - timedelta(minutes=2)
+    assert requeue_jobs(session, heartbeat_before=cutoff, max_attempts=3) == (1, 0)
+    assert _get(session, alive).status == "running"
+    assert _get(session, stale).status == "queued"
+
+
+def test_stale_jobs_out_of_attempts_fail(session):
+    # Killed its worker on every attempt (e.g. out of memory on a huge PDF)
+    doomed = _job(session, status="running", attempts=3, heartbeat_at=STALE)
+    retry = _job(session, status="running", attempts=2, heartbeat_at=STALE)
+
+    cutoff = NOW - timedelta(minutes=2)
+    assert requeue_jobs(session, heartbeat_before=cutoff, max_attempts=3) == (1, 1)
+    job = _get(session, doomed)
+    assert job.status == "failed"
+    assert job.error and job.finished_at is not None
+    assert _get(session, retry).status == "queued"
+    assert claim_job(session, kinds=["transcribe"]).id == retry
+
+
+def test_beat_fails_jobs_out_of_attempts(session, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 2)
+    doomed = _job(session, status="running", attempts=2, heartbeat_at=STALE)
+    before = dict(jobs.stats)
+
+    assert jobs._beat() == 0
+    assert _get(session, doomed).status == "failed"
+    assert jobs.stats["failed_stale"] == before["failed_stale"] + 1
+
+
+@pytest.mark.parametrize("attempts, seconds", [(1, 30), (2, 60), (3, 120)])
+def test_retry_backoff(monkeypatch, attempts, seconds):
+    monkeypatch.setattr(settings, "JOB_RETRY_BACKOFF_SECONDS", 30.0)
+    delay = jobs._retry_at(Job(kind="transcribe", attempts=attempts)) - NOW
+    assert timedelta(seconds=seconds) <= delay < timedelta(seconds=seconds + 60)
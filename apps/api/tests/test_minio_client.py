@@ -0,0 +1,103 @@
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from fastapi import Response
+
+from src.minio_client import _parse_range, plan_ranged_response, presign_put
+
+SIZE = 1000
+HEAD = {
+    "ContentLength": SIZE,
+    "ETag": '"abc"',
+    "LastModified": datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+}
+LAST_MODIFIED = "Tue, 02 Jan 2024 03:04:05 GMT"
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, SIZE - 1)),
+        ("bytes=-100", (SIZE - 100, SIZE - 1)),
+        ("bytes=-5000", (0, SIZE - 1)),
+        ("bytes=900-5000", (900, SIZE - 1)),
+        ("BYTES = 1-2", (1, 2)),
+        # Ignored: served as the full body
+        ("bytes=0-1,5-6", None),
+        ("items=0-1", None),
+        ("bytes=abc", None),
+        ("bytes=-", None),
+        ("bytes=x-1", None),
+        ("bytes=5-1", None),
+    ],
+)
+def test_parse_range(header, expected):
+    assert _parse_range(header, SIZE) == expected
+
+
+@pytest.mark.parametrize(
+    "header, size", [("bytes=1000-", SIZE), ("bytes=-0", SIZE), ("bytes=-1", 0)]
+)
+def test_parse_range_unsatisfiable(header, size):
+    with pytest.raises(ValueError):
+        _parse_range(header, size)
+
+
+def test_full_body_without_range():
+    status, byte_range, headers = plan_ranged_response(HEAD)
+    assert (status, byte_range) == (200, None)
+    assert headers["Content-Length"] == str(SIZE)
+    assert headers["Accept-Ranges"] == "bytes"
+    assert headers["ETag"] == '"abc"'
+    assert headers["Last-Modified"] == LAST_MODIFIED
+
+
+def test_partial_content():
+    status, byte_range, headers = plan_ranged_response(HEAD, range_header="bytes=10-19")
+    assert (status, byte_range) == (206, (10, 19))
+    assert headers["Content-Range"] == f"bytes 10-19/{SIZE}"
+    assert headers["Content-Length"] == "10"
+
+
+def test_unsatisfiable_range():
+    response = plan_ranged_response(HEAD, range_header="bytes=5000-")
+    assert isinstance(response, Response)
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{SIZE}"
+
+
+@pytest.mark.parametrize("if_none_match", ['"abc"', '"old", "abc"', "*"])
+def test_not_modified(if_none_match):
+    response = plan_ranged_response(HEAD, if_none_match=if_none_match)
+    assert isinstance(response, Response)
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize("if_range", ['"abc"', LAST_MODIFIED])
+def test_if_range_current(if_range):
+    status, byte_range, _ = plan_ranged_response(
+        HEAD, range_header="bytes=0-9", if_range=if_range
+    )
+    assert (status, byte_range) == (206, (0, 9))
+
+
+@pytest.mark.parametrize("if_range", ['"stale"', "Mon, 01 Jan 2024 00:00:00 GMT"])
+def test_if_range_stale_sends_full_body(if_range):
+    status, byte_range, headers = plan_ranged_response(
+        HEAD, range_header="bytes=0-9", if_range=if_range
+    )
+    assert (status, byte_range) == (200, None)
+    assert headers["Content-Length"] == str(SIZE)
+    assert "Content-Range" not in headers
+
+
+def test_presign_put_signs_the_checksum():
+    url = presign_put(
+        "users/1/a.pdf", "application/pdf", bucket_name="notes", checksum_sha256="abc="
+    )
+    query = parse_qs(urlsplit(url).query)
+    signed = query["X-Amz-SignedHeaders"][0].split(";")
+    assert "x-amz-checksum-sha256" in signed
+    assert "content-type" in signed
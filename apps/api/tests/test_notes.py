@@ -0,0 +1,219 @@
+import base64
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import select
+
+from src import blobs, deps
+from src.main import app
+from src.models import Blob, Note, User
+from src.routers import notes
+from src.settings import settings
+
+PDF = b"%PDF-1.4\n" + b"lecture notes " * 100
+
+
+def _checksum(data: bytes) -> str:
+    return base64.b64encode(hashlib.sha256(data).digest()).decode()
+
+
+class FakeStorage:
+    # Just enough of minio_client for /notes/finalize, which must never read the body
+    def __init__(self):
+        self.objects = {}
+        self.copies = []
+
+    def put(self, key, data, checksum=True):
+        self.objects[key] = {
+            "ContentLength": len(data),
+            "ContentType": "application/pdf",
+            "ETag": f'"{hashlib.md5(data).hexdigest()}"',
+            "ChecksumSHA256": _checksum(data) if checksum else None,
+            "Body": data,
+        }
+
+    def head(self, key, bucket, checksum=False):
+        obj = self.objects.get(key)
+        return obj and {k: v for k, v in obj.items() if k != "Body"}
+
+    def read_range(self, key, bucket, start, end, if_match=None):
+        obj = self.objects.get(key)
+        if obj is None or (if_match and obj["ETag"] != if_match):
+            return None
+        return obj["Body"][start : end + 1]
+
+    def copy(self, src, dest, bucket, src_bucket=None, if_match=None, **kwargs):
+        obj = self.objects.get(src)
+        if obj is None or (if_match and obj["ETag"] != if_match):
+            return False
+        self.copies.append(dest)
+        self.objects[dest] = dict(obj)
+        return True
+
+    def delete(self, key, bucket):
+        return self.objects.pop(key, None) is not None
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    fake = FakeStorage()
+    monkeypatch.setattr(notes, "head_from_minio", fake.head)
+    monkeypatch.setattr(notes, "read_range_from_minio", fake.read_range)
+    monkeypatch.setattr(notes, "copy_within_minio", fake.copy)
+    monkeypatch.setattr(notes, "delete_from_minio", fake.delete)
+    monkeypatch.setattr(blobs, "_delete_object", fake.delete)
+    monkeypatch.setattr(blobs.minio_client, "head_from_minio", fake.head)
+    monkeypatch.setattr(settings, "NOTE_PREVIEWS_ON_UPLOAD", False)
+    return fake
+
+
+@pytest.fixture
+def client(session, users):
+    current = {"user": users[0]}
+    app.dependency_overrides[deps.get_current_db_user] = lambda: current["user"]
+    app.dependency_overrides[deps.get_current_db_user_async] = lambda: current["user"]
+    client = TestClient(app)
+    client.current = current
+    yield client
+    app.dependency_overrides.clear()
+
+
+def _finalize(client, key):
+    return client.post(
+        "/notes/finalize",
+        json={
+            "objectKey": key,
+            "title": "Recursion",
+            "course_id": 1,
+            "course_name": "COP3502",
+            "semester": "Fall",
+        },
+    )
+
+
+def test_finalize_uses_the_upload_checksum(client, storage, session):
+    storage.put("users/1/a.pdf", PDF)
+    response = _finalize(client, "users/1/a.pdf")
+    assert response.status_code == 200
+
+    digest = hashlib.sha256(PDF).hexdigest()
+    assert response.json()["object_key"] == blobs.blob_key(digest)
+    assert storage.copies == [blobs.blob_key(digest)]
+    assert "users/1/a.pdf" not in storage.objects
+    blob = session.exec(select(Blob)).one()
+    assert (blob.sha256, blob.size, blob.ref_count) == (digest, len(PDF), 1)
+
+
+def test_finalize_deduplicates(client, storage, session, users):
+    storage.put("users/1/a.pdf", PDF)
+    assert _finalize(client, "users/1/a.pdf").status_code == 200
+    client.current["user"] = users[1]
+    storage.put("users/2/b.pdf", PDF)
+    assert _finalize(client, "users/2/b.pdf").status_code == 200
+
+    assert len(storage.copies) == 1
+    assert session.exec(select(Blob)).one().ref_count == 2
+    keys = session.exec(select(Note.object_key)).all()
+    assert len(set(keys)) == 1
+
+
+def test_finalize_requires_a_checksum(client, storage, session):
+    storage.put("users/1/a.pdf", PDF, checksum=False)
+    response = _finalize(client, "users/1/a.pdf")
+    assert response.status_code == 400
+    assert session.exec(select(Blob)).first() is None
+
+
+def test_finalize_rejects_an_upload_replaced_midway(
+    client, storage, session, monkeypatch
+):
+    storage.put("users/1/a.pdf", PDF)
+    copy = storage.copy
+
+    def replace_then_copy(*args, **kwargs):
+        # The presigned URL is still valid: a second PUT lands before the copy
+        storage.put("users/1/a.pdf", PDF + b"%% appended")
+        return copy(*args, **kwargs)
+
+    monkeypatch.setattr(notes, "copy_within_minio", replace_then_copy)
+    response = _finalize(client, "users/1/a.pdf")
+    assert response.status_code == 409
+    assert storage.copies == []
+    assert session.exec(select(Blob)).first() is None
+    assert session.exec(select(Note)).first() is None
+
+
+def test_finalize_other_users_upload(client, storage):
+    storage.put("users/2/a.pdf", PDF)
+    assert _finalize(client, "users/2/a.pdf").status_code == 403
+
+
+def test_rating_with_the_async_user_dependency(session, users, monkeypatch):
+    # Signed in as a new user: the first request creates the row, later ones hit the
+    # identity cache and only look the user up by id
+    monkeypatch.setattr(deps, "_user_cache", deps.TTLCache(10, 60))
+    app.dependency_overrides[deps.require_user] = lambda: {
+        "sub": "rater",
+        "email": "rater@example.com",
+    }
+    note = Note(
+        title="Recursion",
+        course_id=1,
+        course_name="COP3502",
+        semester="Fall",
+        author_id=users[1].id,
+        is_free=True,
+    )
+    session.add(note)
+    session.commit()
+    try:
+        client = TestClient(app)
+        for rating in (4, 2):
+            response = client.put(f"/notes/{note.id}/rating", json={"rating": rating})
+            assert response.status_code == 200
+        assert client.delete(f"/notes/{note.id}/rating").status_code == 200
+        assert client.delete(f"/notes/{note.id}/rating").status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+
+    rater = session.exec(select(User).where(User.sub == "rater")).one()
+    assert deps._user_cache.get("rater")[1] == rater.id
+    session.refresh(note)
+    assert (note.rating_count, note.rating_sum) == (0, 0)
+
+
+def test_search_never_loads_search_vector(session, users):
+    for title in ("Recursion basics", "Recursion trees", "Sorting"):
+        session.add(
+            Note(
+                title=title,
+                course_id=1,
+                course_name="COP3502",
+                semester="Fall",
+                author_id=users[1].id,
+            )
+        )
+    session.commit()
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = TestClient(app).get("/notes/search", params={"query": "recursion"})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert "search_vector" not in response.json()[0]
+    # One query, the vector is only used in WHERE/ORDER BY, never selected or lazy
+    # loaded while the response is serialized
+    (sql,) = statements
+    columns = sql.split("FROM")[0]
+    assert ", note.search_vector," not in columns
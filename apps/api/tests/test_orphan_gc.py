@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import Session, select
+
+from src import orphan_gc
+from src.blobs import acquire_blob, blob_key
+from src.models import Blob, Note
+
+OLD = datetime.now(timezone.utc) - timedelta(days=2)
+
+
+class FakeBucket:
+    def __init__(self, keys, after_listing=None):
+        self.keys = set(keys)
+        self.after_listing = after_listing
+
+    def list(self, bucket, prefix=""):
+        yield [
+            {"Key": key, "LastModified": OLD, "Size": 1} for key in sorted(self.keys)
+        ]
+        # The scan is done, the batch is deleted next
+        if self.after_listing:
+            self.after_listing()
+
+    def delete_many(self, keys, bucket):
+        self.keys -= set(keys)
+        return len(keys), 0
+
+    def head(self, key, bucket):
+        return {"ContentLength": 1} if key in self.keys else None
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    fake = FakeBucket([])
+    client = orphan_gc.minio_client
+    monkeypatch.setattr(client, "list_objects_from_minio", fake.list)
+    monkeypatch.setattr(client, "delete_many_from_minio", fake.delete_many)
+    monkeypatch.setattr(client, "head_from_minio", fake.head)
+    return fake
+
+
+def _blob(session, digest, *, ref_count=1, acquired_at=OLD):
+    blob = Blob(
+        sha256=digest,
+        object_key=blob_key(digest),
+        size=1,
+        ref_count=ref_count,
+        created_at=OLD,
+        acquired_at=acquired_at,
+    )
+    session.add(blob)
+    session.commit()
+    return blob.object_key
+
+
+def _note(session, users, object_key):
+    session.add(
+        Note(
+            title="Recursion",
+            course_id=1,
+            course_name="COP3502",
+            semester="Fall",
+            author_id=users[1].id,
+            object_key=object_key,
+        )
+    )
+    session.commit()
+
+
+def test_collects_unreferenced_and_leaked_objects(session, users, bucket):
+    used = _blob(session, "a" * 64)
+    _note(session, users, used)
+    leaked = _blob(session, "b" * 64)  # acquired, its Note was never created
+    in_flight = _blob(session, "c" * 64, acquired_at=datetime.now(timezone.utc))
+    bucket.keys = {used, leaked, in_flight, "users/1/abandoned.pdf"}
+
+    stats = orphan_gc.collect_orphans("notes")
+
+    assert bucket.keys == {used, in_flight}
+    assert (stats.orphans, stats.deleted, stats.referenced) == (2, 2, 2)
+    rows = session.exec(select(Blob.object_key)).all()
+    assert set(rows) == {used, in_flight}
+
+
+def test_keeps_a_blob_acquired_during_the_scan(session, users, bucket, engine):
+    # Left in storage without a blob row (its release failed to delete it), then
+    # the same file is uploaded again while the GC is scanning
+    digest = "d" * 64
+    leaked = blob_key(digest)
+    bucket.keys = {leaked}
+
+    def upload_same_file():
+        with Session(engine) as other:
+            acquire_blob(
+                other,
+                sha256=digest,
+                object_key=leaked,
+                size=1,
+                bucket_name="notes",
+            )
+
+    bucket.after_listing = upload_same_file
+    stats = orphan_gc.collect_orphans("notes")
+
+    assert bucket.keys == {leaked}
+    assert (stats.orphans, stats.deleted) == (0, 0)
+    session.expire_all()
+    assert session.get(Blob, digest).ref_count == 1
+
+
+def test_dry_run_deletes_nothing(session, users, bucket):
+    leaked = _blob(session, "e" * 64)
+    bucket.keys = {leaked}
+    stats = orphan_gc.collect_orphans("notes", dry_run=True)
+    assert stats.orphans == 1
+    assert bucket.keys == {leaked}
+    assert session.exec(select(Blob)).first() is not None
@@ -0,0 +1,122 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlmodel import Session, func, select
+
+from src.db import create_purchase
+from src.models import Note, Purchase, User
+
+
+def _notes(session, author, count=1, price=100) -> list[int]:
+    notes = [
+        Note(
+            title=f"Lecture {i}",
+            course_id=1,
+            course_name="COP3502",
+            semester="Fall",
+            author_id=author.id,
+            price=price,
+        )
+        for i in range(count)
+    ]
+    session.add_all(notes)
+    session.commit()
+    return [note.id for note in notes]
+
+
+def _points(session, *users) -> tuple:
+    session.expire_all()
+    return tuple(session.get(User, user.id).points for user in users)
+
+
+def test_purchase_charges_the_buyer_and_credits_the_author(session, users):
+    buyer, author = users
+    (note_id,) = _notes(session, author)
+
+    purchase = create_purchase(session, user_id=buyer.id, note_id=note_id, price=100)
+    assert (purchase.user_id, purchase.note_id, purchase.price_paid) == (
+        buyer.id,
+        note_id,
+        100,
+    )
+    assert _points(session, buyer, author) == (900, 1050)
+
+
+def test_repeat_purchase_is_rejected_without_charging(session, users):
+    buyer, author = users
+    (note_id,) = _notes(session, author)
+    create_purchase(session, user_id=buyer.id, note_id=note_id, price=100)
+
+    with pytest.raises(ValueError, match="already purchased"):
+        create_purchase(session, user_id=buyer.id, note_id=note_id, price=100)
+    assert _points(session, buyer, author) == (900, 1050)
+
+
+def test_insufficient_points(session, users):
+    buyer, author = users
+    (note_id,) = _notes(session, author, price=5000)
+
+    with pytest.raises(ValueError, match="Insufficient points"):
+        create_purchase(session, user_id=buyer.id, note_id=note_id, price=5000)
+    assert _points(session, buyer, author) == (1000, 1000)
+    assert session.exec(select(Purchase)).first() is None
+
+
+def test_self_purchase_is_not_credited(session, users):
+    buyer, _ = users
+    (note_id,) = _notes(session, buyer)
+    create_purchase(session, user_id=buyer.id, note_id=note_id, price=100)
+    assert _points(session, buyer) == (900,)
+
+
+def test_unknown_note(session, users):
+    with pytest.raises(ValueError, match="not found"):
+        create_purchase(session, user_id=users[0].id, note_id=999, price=0)
+
+
+def _buy(engine, user_id, note_id, price):
+    with Session(engine) as session:
+        try:
+            create_purchase(session, user_id=user_id, note_id=note_id, price=price)
+            return True
+        except ValueError:
+            return False
+
+
+def test_concurrent_purchases_never_overdraw(session, users, engine):
+    # 1000 points, twenty 100-point notes bought at once: exactly ten go through
+    buyer, author = users
+    note_ids = _notes(session, author, count=20)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        bought = list(pool.map(lambda n: _buy(engine, buyer.id, n, 100), note_ids))
+
+    assert bought.count(True) == 10
+    assert _points(session, buyer, author) == (0, 1500)
+    assert session.exec(select(func.count()).select_from(Purchase)).one() == 10
+
+
+def test_concurrent_double_purchase_charges_once(session, users, engine):
+    buyer, author = users
+    (note_id,) = _notes(session, author)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        bought = list(
+            pool.map(lambda _: _buy(engine, buyer.id, note_id, 100), range(8))
+        )
+
+    assert bought.count(True) == 1
+    assert _points(session, buyer, author) == (900, 1050)
+
+
+def test_opposite_purchases_do_not_deadlock(session, users, engine):
+    # Each user buys the other's notes at the same time; the row locks are taken in
+    # id order, so neither transaction waits on the other's second lock
+    buyer, author = users
+    theirs = _notes(session, author, count=5, price=10)
+    mine = _notes(session, buyer, count=5, price=10)
+    orders = [(buyer.id, n) for n in theirs] + [(author.id, n) for n in mine]
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        bought = list(pool.map(lambda o: _buy(engine, *o, 10), orders))
+
+    assert all(bought)
+    # 5 x -10 spent, 5 x +5 earned each
+    assert _points(session, buyer, author) == (975, 975)
@@ -0,0 +1,31 @@
+import pymupdf
+
+from src.bench_transcribe import synthetic_pdf
+from src.ocr import LocalBackend
+from src.transcribe import _latin1, transcribe_pdf
+
+
+def test_local_backend_reads_text_layer():
+    pages = LocalBackend().recognize(synthetic_pdf(2))
+    assert len(pages) == 2
+    assert len(pages[0].paragraphs) == 8
+    paragraph = pages[1].paragraphs[0]
+    assert paragraph.text == "Page 2, paragraph 1: lecture notes on recursion"
+    assert paragraph.x1 < paragraph.x2 and paragraph.y1 < paragraph.y2
+
+
+def test_transcribe_pdf_overlays_paragraphs():
+    data = transcribe_pdf(synthetic_pdf(2), False, backend=LocalBackend())
+    with pymupdf.open(stream=data, filetype="pdf") as doc:
+        assert len(doc) == 2
+        texts = [
+            annot.info["content"]
+            for annot in doc[0].annots()
+            if annot.type[1] == "FreeText"
+        ]
+    assert len(texts) == 8
+    assert texts[0] == "Page 1, paragraph 1: lecture notes on recursion"
+
+
+def test_latin1():
+    assert _latin1("café ÿĀ ∑") == "café ÿ   "
@@ -0,0 +1,71 @@
+import pytest
+
+from src import ttl_cache
+from src.ttl_cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_get_set(clock):
+    cache = TTLCache(10, 30)
+    assert cache.get("a") is None
+    assert cache.get("a", "default") == "default"
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_expiry(clock):
+    cache = TTLCache(10, 30)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+    clock[0] += 30
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    clock[0] += 30
+    assert cache.get("b") is None
+    assert len(cache) == 0
+
+
+def test_lru_eviction(clock):
+    cache = TTLCache(2, 30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now the least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_add(clock):
+    cache = TTLCache(10, 30)
+    assert cache.add("a")
+    assert not cache.add("a")
+    clock[0] += 30
+    assert cache.add("a")
+
+
+@pytest.mark.parametrize("maxsize, ttl", [(0, 30), (10, 0)])
+def test_disabled(clock, maxsize, ttl):
+    cache = TTLCache(maxsize, ttl)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.add("a") and cache.add("a")
+
+
+def test_pop_and_clear(clock):
+    cache = TTLCache(10, 30)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.pop("a")
+    cache.pop("missing")
+    assert cache.get("a") is None
+    cache.clear()
+    assert len(cache) == 0
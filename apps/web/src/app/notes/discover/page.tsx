@@ -8,8 +8,10 @@ import Link from "next/link";
 export default function DiscoverNotesPage() {
   const { getToken } = useAuth();
   const [notes, setNotes] = useState<Note[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [courses, setCourses] = useState<Course[]>([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchQuery, setSearchQuery] = useState("");
   const [selectedCourse, setSelectedCourse] = useState<number | null>(null);
   const [selectedSemester, setSelectedSemester] = useState("");
@@ -25,24 +27,45 @@ export default function DiscoverNotesPage() {
   };
 
 
+  // One page of results for the current filters, pass the previous nextCursor for more
+  const searchPage = async (cursor?: string) => {
+    const token = await getToken({ template: "fastapi" });
+    return notesApi.search(
+      {
+        query: searchQuery || undefined,
+        course_id: selectedCourse || undefined,
+        semester: selectedSemester || undefined,
+        limit: 50,
+        cursor,
+      },
+      token || undefined
+    );
+  };
+
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await searchPage(nextCursor);
+      setNotes((prev) => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error("Failed to load more notes:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     async function loadData() {
       try {
         setLoading(true);
-        const token = await getToken({ template: "fastapi" });
-        const [notesData, coursesData] = await Promise.all([
-          notesApi.search(
-            {
-              query: searchQuery || undefined,
-              course_id: selectedCourse || undefined,
-              semester: selectedSemester || undefined,
-              limit: 50,
-            },
-            token || undefined
-          ),
+        const [notesPage, coursesData] = await Promise.all([
+          searchPage(),
           coursesApi.list(),
         ]);
-        setNotes(notesData);
+        setNotes(notesPage.items);
+        setNextCursor(notesPage.nextCursor);
         setCourses(coursesData);
       } catch (error) {
         console.error("Failed to load data:", error);
@@ -198,6 +221,19 @@ export default function DiscoverNotesPage() {
               ))}
             </div>
           )}
+
+          {!loading && nextCursor && (
+            <div className="mt-8 text-center">
+              <button
+                type="button"
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="bg-blue-600 text-white py-2 px-4 rounded-lg hover:bg-blue-700 transition-colors text-sm font-medium disabled:opacity-50"
+              >
+                {loadingMore ? "Loading..." : "Load more"}
+              </button>
+            </div>
+          )}
         </main>
       </div>
     </div>
@@ -11,20 +11,27 @@ export default function NotesPage() {
   const { getToken } = useAuth();
   const [activeTab, setActiveTab] = useState<TabKey>("library");
   const [notes, setNotes] = useState<Note[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  // One page of the active tab, the API returns 20 notes at a time
+  const fetchPage = async (cursor?: string) => {
+    const token = await getToken({ template: "fastapi" });
+    if (!token) return null;
+    return activeTab === "library"
+      ? await notesApi.getLibrary(token, cursor)
+      : await notesApi.getUploaded(token, cursor);
+  };
 
   useEffect(() => {
     async function fetchNotes() {
       setLoading(true);
       try {
-        const token = await getToken({ template: "fastapi" });
-        if (!token) return;
-
-        const data =
-          activeTab === "library"
-            ? await notesApi.getLibrary(token)
-            : await notesApi.getUploaded(token);
-        setNotes(data);
+        const page = await fetchPage();
+        if (!page) return;
+        setNotes(page.items);
+        setNextCursor(page.nextCursor);
       } catch (error) {
         console.error("Failed to fetch notes:", error);
       } finally {
@@ -35,6 +42,21 @@ export default function NotesPage() {
     fetchNotes();
   }, [activeTab, getToken]);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(nextCursor);
+      if (!page) return;
+      setNotes((prev) => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error("Failed to fetch more notes:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getColorForNote = (index: number) => {
     const colors = [
       "bg-blue-400",
@@ -167,6 +189,19 @@ export default function NotesPage() {
               </Link>
             ))}
           </div>
+
+          {nextCursor && (
+            <div className="mt-8 text-center">
+              <button
+                type="button"
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="rounded-lg border border-blue-300 bg-blue-50 px-4 py-2 text-sm font-medium text-blue-700 hover:bg-blue-100 transition disabled:opacity-50"
+              >
+                {loadingMore ? "Loading..." : "Load more"}
+              </button>
+            </div>
+          )}
         </section>
       )}
     </main>
@@ -1,5 +1,7 @@
 import axios from "axios";
-import { apiFetch } from "./http";
+import { apiFetch, apiFetchPage } from "./http";
+
+export type { Page } from "./http";
 
 export const api = axios.create({
   baseURL: process.env.NEXT_PUBLIC_API_BASE_URL ?? "http://localhost:8000",
@@ -17,6 +19,8 @@ export type Note = {
   author_id: number;
   downloads: number;
   views: number;
+  rating_count: number;
+  rating_avg: number; // 0 when unrated
   created_at: string;
   object_key?: string;
   file_type?: string;
@@ -65,20 +69,27 @@ export const notesApi = {
       query?: string;
       course_id?: number;
       semester?: string;
+      sort?: "rating";
       limit?: number;
-      offset?: number;
+      cursor?: string; // nextCursor of the previous page
     },
     token?: string
   ) => {
     const qs = buildQueryString(params);
-    return apiFetch<Note[]>(`/notes/search${qs}`, { auth: true, token });
+    return apiFetchPage<Note>(`/notes/search${qs}`, { auth: true, token });
   },
 
-  getLibrary: (token?: string) =>
-    apiFetch<Note[]>("/notes/library", { auth: true, token }),
+  getLibrary: (token?: string, cursor?: string) =>
+    apiFetchPage<Note>(`/notes/library${buildQueryString({ cursor })}`, {
+      auth: true,
+      token,
+    }),
 
-  getUploaded: (token?: string) =>
-    apiFetch<Note[]>("/notes/uploaded", { auth: true, token }),
+  getUploaded: (token?: string, cursor?: string) =>
+    apiFetchPage<Note>(`/notes/uploaded${buildQueryString({ cursor })}`, {
+      auth: true,
+      token,
+    }),
 
   purchase: (noteId: number, token?: string) =>
     apiFetch<Purchase>(`/notes/${noteId}/purchase`, {
@@ -115,6 +126,19 @@ export const notesApi = {
     return (await res.json()) as Note;
   },
 
+  // Transcription runs in the background after upload, poll until done/failed
+  getTranscription: (noteId: number, token?: string) =>
+    apiFetch<{
+      note_id: number;
+      job_id: number;
+      status: "queued" | "running" | "done" | "failed";
+      attempts: number;
+      error: string | null;
+      created_at: string;
+      started_at: string | null;
+      finished_at: string | null;
+    }>(`/notes/${noteId}/transcription`, { auth: true, token }),
+
   // Download note, returns blob for file download
   download: async (noteId: number, token: string) => {
     const res = await fetch(
@@ -143,8 +167,10 @@ export const notesApi = {
 export const coursesApi = {
   list: () => apiFetch<Course[]>("/courses"),
 
-  getNotes: (courseId: number) =>
-    apiFetch<Note[]>(`/courses/${courseId}/notes`),
+  getNotes: (courseId: number, cursor?: string) =>
+    apiFetchPage<Note>(
+      `/courses/${courseId}/notes${buildQueryString({ cursor })}`
+    ),
 
   create: (
     data: { code: string; title: string; school: string },
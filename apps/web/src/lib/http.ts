@@ -6,7 +6,16 @@ interface ApiOptions extends RequestInit {
   token?: string; // can optionally pass a pre-fetched token
 }
 
-export async function apiFetch<T>(path: string, opts: ApiOptions = {}): Promise<T> {
+// One page of a keyset-paginated list endpoint. Pass nextCursor back as `cursor`
+// to get the following page, it is null on the last page
+export type Page<T> = {
+  items: T[];
+  nextCursor: string | null;
+};
+
+const NEXT_CURSOR_HEADER = "X-Next-Cursor";
+
+async function request(path: string, opts: ApiOptions): Promise<Response> {
   const headers: Record<string, string> = {
     Accept: "application/json",
     ...(opts.headers as Record<string, string>),
@@ -24,6 +33,23 @@ export async function apiFetch<T>(path: string, opts: ApiOptions = {}): Promise<
     const text = await res.text();
     throw new Error(`API ${res.status} ${res.statusText}: ${text}`);
   }
+  return res;
+}
+
+export async function apiFetch<T>(path: string, opts: ApiOptions = {}): Promise<T> {
+  const res = await request(path, opts);
   if (res.status === 204) return undefined as T;
   return (await res.json()) as T;
 }
+
+// For list endpoints: the items plus the cursor from the X-Next-Cursor header
+export async function apiFetchPage<T>(
+  path: string,
+  opts: ApiOptions = {}
+): Promise<Page<T>> {
+  const res = await request(path, opts);
+  return {
+    items: (await res.json()) as T[],
+    nextCursor: res.headers.get(NEXT_CURSOR_HEADER),
+  };
+}